@@ -0,0 +1,210 @@
+"""
+Benchmark of the trailer relevance matcher.
+
+Classifies a few thousand video titles with the previous implementation of 'checkWrongShowOrSeason' (uncompiled patterns,
+one call per video) and with 'TrailerMatcher' (compiled patterns, one matcher per episode, batch classification),
+and reports the time per title and how many titles the two implementations classify differently.
+
+Before timing anything, both implementations are checked against 'REFERENCE_TITLES', a fixed list of real-world upload titles
+with the expected answer for each. The matcher must give every expected answer, and the previous implementation must agree with
+it everywhere except on the rows that record one of its known bugs; the benchmark stops with exit status 1 otherwise.
+
+Usage:
+    python benchmarks/bench_matcher.py [titles.txt] [--repeat N] [--check-only]
+
+The titles file has one line per video: '<show name>|<season>|<episode>|<video title>'.
+Without a file, titles are generated from the formats used by the trailer, promo and recap uploads of the seed TV shows.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher import TrailerMatcher
+
+SHOWS = ["Band of Brothers", "Game of Thrones", "The Sopranos", "Sherlock", "The Wire", "Stranger Things", "The Mandalorian",
+         "Dark", "Friends", "The Office", "Parks and Recreation", "The Crown", "The Boys", "Squid Game", "Wednesday", "You", "The Rookie"]
+
+FORMATS = ["{show} S{season:02d}E{episode:02d} Trailer", "{show} Season {season} Episode {episode} Promo (HD)",
+           "{show} {season}x{episode:02d} Sneak Peek", "{show} | Season {season} - Ep. {episode} | Official Preview",
+           "{show} season {season} episode {episode} recap and review", "{show} s{season} e{episode} reaction!!",
+           "{show} Episode {episode} Trailer", "{show} Season {season} Official Trailer | Netflix",
+           "{show} - Behind the scenes", "The best moments of {show} S{season}", "{show} EP{episode} breakdown"]
+
+# Titles in the shapes YouTube uploads use: (show, season, episode, title, description, relevant, legacy bug).
+# The last field names the bug of the previous implementation that gives the wrong answer on the row, or 'None' when both must agree.
+EPISODE_OVERWRITES_SEASON = "an 'episode N' mention overwrites the season"
+EPISODE_IGNORED = "the episode is never compared"
+REFERENCE_TITLES = [
+    ("Stranger Things", 4, 1, "Stranger Things 4 | Official Trailer | Netflix", "", False, None),
+    ("Stranger Things", 4, 1, "Stranger Things Season 4 Episode 1 Promo (HD)", "", True, EPISODE_OVERWRITES_SEASON),
+    ("Stranger Things", 4, 1, "Stranger Things S04E01 Promo", "", True, None),
+    ("Stranger Things", 4, 2, "Stranger Things S04E01 Promo", "", False, EPISODE_IGNORED),
+    ("Stranger Things", 4, 1, "Stranger Things 4x01 Sneak Peek", "", True, None),
+    ("The Boys", 4, 3, "The Boys Season 4 Episode 3 Promo \"We'll Keep the Red Flag Flying Here\"", "", True, EPISODE_OVERWRITES_SEASON),
+    ("The Boys", 4, 3, "The Boys 4x03 Promo (HD)", "", True, None),
+    ("The Boys", 4, 3, "The Boys S04E03 Recap", "", True, None),
+    ("The Boys", 4, 3, "The Boys – Season 4 Official Trailer | Prime Video", "", True, None),
+    ("The Boys", 4, 3, "Gen V Season 1 Episode 3 Promo", "", False, None),
+    ("The Boys", 4, 3, "The Boys Presents: Diabolical | Official Trailer", "", False, None),
+    ("The Boys", 4, 3, "THE BOYS Season 4 Episode 3 Breakdown & Easter Eggs", "", True, EPISODE_OVERWRITES_SEASON),
+    ("The Boys", 4, 3, "The Boys season 3 episode 3 reaction", "", False, None),
+    ("The Boys", 4, 3, "The Boys | Episode 3 Preview", "Season 4 is streaming now", True, EPISODE_OVERWRITES_SEASON),
+    ("The Rookie", 6, 2, "The Rookie 6x02 Promo \"Strike Back\" (HD) Nathan Fillion series", "", True, None),
+    ("The Rookie", 6, 2, "The Rookie 6x03 Promo \"Training Day\" (HD)", "", False, EPISODE_IGNORED),
+    ("The Rookie", 6, 2, "The Rookie S06E02 Sneak Peek Clip", "", True, None),
+    ("The Rookie", 6, 2, "The Rookie Season 6 Episode 2 | Promo | ABC", "", True, EPISODE_OVERWRITES_SEASON),
+    ("The Rookie", 6, 2, "The Rookie: Feds 1x02 Promo", "", False, None),
+    ("House of the Dragon", 2, 4, "House of the Dragon Season 2 | Episode 4 Preview | Max", "", True, EPISODE_OVERWRITES_SEASON),
+    ("House of the Dragon", 2, 4, "House of the Dragon S2 E4 Preview", "", True, None),
+    ("House of the Dragon", 2, 4, "House of the Dragon 2x04 Promo \"The Red Dragon and the Gold\"", "", True, None),
+    ("House of the Dragon", 2, 4, "House of the Dragon Season 2 Episode 5 Preview", "", False, None),
+    ("House of the Dragon", 2, 4, "House of the Dragon | Official Teaser | HBO", "", False, None),
+    ("The Last of Us", 1, 2, "The Last of Us | Episode 2 Preview | HBO", "Season 1 of The Last of Us", True, EPISODE_OVERWRITES_SEASON),
+    ("The Last of Us", 1, 2, "The Last of Us 1x02 Promo \"Infected\" (HD)", "", True, None),
+    ("The Last of Us", 1, 2, "The Last of Us Episode 2 Promo", "", False, None),
+    ("Wednesday", 1, 2, "Wednesday S01E02 Scene", "", True, None),
+    ("Wednesday", 1, 2, "Wednesday Season 1 Episode 2 Recap", "", True, EPISODE_OVERWRITES_SEASON),
+    ("Wednesday", 1, 2, "Wednesday: Season 2 | Official Trailer | Netflix", "", False, None),
+    ("Succession", 4, 3, "Succession Season 4 Episode 3 Promo (HD) Series Finale", "", True, EPISODE_OVERWRITES_SEASON),
+    ("Succession", 4, 3, "Succession 4x03 \"Connor's Wedding\" Preview", "", True, None),
+    ("Succession", 4, 3, "Succession S04 E03 Preview | HBO", "", True, None)
+]
+
+
+def legacyCheckWrongShowOrSeason(videoTitle, videoDescription, showName, targetSeason, targetEpisode):
+    """The implementation of 'checkWrongShowOrSeason' before the compiled matcher, kept for comparison."""
+    titleLower = videoTitle.lower()
+    descriptionLower = videoDescription.lower()
+    showNameLower = showName.lower()
+
+    if showNameLower not in titleLower:
+        return True
+
+    seasonPatterns = [r"season (\d+)", r"s(\d+)", r"(\d+)x", r"episode (\d+)", r"ep(\d+)"]
+
+    foundSeason = None
+    foundEpisode = None
+
+    for seasonPattern in seasonPatterns:
+        matches = re.findall(seasonPattern, titleLower)
+        for match in matches:
+            if isinstance(match, tuple):
+                foundSeason = int(match[0])
+                foundEpisode = int(match[1]) if len(match) > 1 else None
+            else:
+                foundSeason = int(match)
+
+    if foundSeason is None and foundEpisode is None:
+        matches = re.findall(r"season (\d+)", descriptionLower)
+        if matches:
+            foundSeason = int(matches[0])
+
+    if foundSeason != targetSeason or (foundEpisode is not None and foundEpisode != targetEpisode):
+        return True
+
+    return False
+
+
+def checkReferenceTitles():
+    """
+    Classifies 'REFERENCE_TITLES' with both implementations ('isRelevant' and 'classify' for the matcher).
+
+    Returns:
+        list: A description of every row where an implementation doesn't give the answer the list expects (empty if all pass).
+    """
+    failures = []
+    for show, season, episode, title, description, relevant, legacyBug in REFERENCE_TITLES:
+        matcher = TrailerMatcher(show, season, episode)
+        item = {"snippet": {"title": title, "description": description}}
+        if matcher.isRelevant(title, description) != relevant or (matcher.classify([item]) == [item]) != relevant:
+            failures.append(f"TrailerMatcher: expected relevant={relevant} for '{title}' ({show} S{season}E{episode})")
+
+        legacyRelevant = not legacyCheckWrongShowOrSeason(title, description, show, season, episode)
+        if legacyBug is None and legacyRelevant != relevant:
+            failures.append(f"legacy: expected relevant={relevant} for '{title}' ({show} S{season}E{episode})")
+        elif legacyBug is not None and legacyRelevant == relevant:
+            failures.append(f"legacy: the bug '{legacyBug}' is recorded for '{title}', but the answer is right")
+    return failures
+
+
+def generateTitles(count, seed=42):
+    generator = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        show = generator.choice(SHOWS)
+        targetSeason, targetEpisode = generator.randint(1, 8), generator.randint(1, 12)
+        season = targetSeason if generator.random() < 0.6 else generator.randint(1, 8)
+        episode = targetEpisode if generator.random() < 0.6 else generator.randint(1, 12)
+        title = generator.choice(FORMATS).format(show=show if generator.random() < 0.9 else generator.choice(SHOWS),
+                                                 season=season, episode=episode)
+        samples.append((show, targetSeason, targetEpisode, title))
+    return samples
+
+
+def loadTitles(path):
+    samples = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            parts = line.rstrip("\n").split("|", 3)
+            if len(parts) == 4:
+                samples.append((parts[0], int(parts[1]), int(parts[2]), parts[3]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the trailer relevance matcher")
+    parser.add_argument("titles", nargs="?", help="file with '<show>|<season>|<episode>|<title>' lines")
+    parser.add_argument("--count", type=int, default=5000, help="number of generated titles when no file is given")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed repetitions")
+    parser.add_argument("--check-only", action="store_true", help="only check the reference titles")
+    args = parser.parse_args()
+
+    failures = checkReferenceTitles()
+    legacyBugs = sum(1 for row in REFERENCE_TITLES if row[-1] is not None)
+    print(f"reference titles: {len(REFERENCE_TITLES)}, same answer: {len(REFERENCE_TITLES) - legacyBugs}, "
+          f"legacy bugs fixed: {legacyBugs}, failures: {len(failures)}")
+    for failure in failures:
+        print(f"  {failure}")
+    if failures:
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    samples = loadTitles(args.titles) if args.titles else generateTitles(args.count)
+
+    groups = {}
+    for show, season, episode, title in samples:
+        groups.setdefault((show, season, episode), []).append({"snippet": {"title": title, "description": ""}})
+
+    legacyBest = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        legacyResults = [not legacyCheckWrongShowOrSeason(title, "", show, season, episode) for show, season, episode, title in samples]
+        legacyBest = min(legacyBest, time.perf_counter() - started)
+
+    matcherBest = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        relevant = {}
+        for (show, season, episode), items in groups.items():
+            relevant[(show, season, episode)] = TrailerMatcher(show, season, episode).classify(items)
+        matcherBest = min(matcherBest, time.perf_counter() - started)
+
+    relevantTitles = {(key, item["snippet"]["title"]) for key, items in relevant.items() for item in items}
+    matcherResults = [((show, season, episode), title) in relevantTitles for show, season, episode, title in samples]
+    differences = sum(1 for legacy, current in zip(legacyResults, matcherResults) if legacy != current)
+
+    print(f"titles: {len(samples)}")
+    print(f"legacy checkWrongShowOrSeason: {legacyBest * 1e6 / len(samples):.2f} us/title")
+    print(f"TrailerMatcher.classify:       {matcherBest * 1e6 / len(samples):.2f} us/title")
+    print(f"relevant (legacy / matcher):   {sum(legacyResults)} / {sum(matcherResults)}")
+    print(f"titles classified differently: {differences}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark of the startup reports and of one notification poll cycle, against local stand-ins of the upstream APIs.
+
+For every watchlist size, a fresh process seeds a benchmark database with synthetic TV shows, points the application
+at the stand-ins of 'standins.py' (with the configured latency) and measures, for each entry point, the wall time,
+the number of upstream requests (per API) and the number of database statements.
+
+Usage:
+    python benchmarks/bench_startup.py [--sizes 10 1000 10000] [--latency-ms 50] [--recordings FILE [--record]]
+                                       [--backend mysql|sqlite] [--database bingewatch_bench]
+
+With the MySQL backend, the statements are the ones the server received ('Questions', transaction control included); the database
+user and password are the ones of 'config.py', and the benchmark database is dropped and created again for every size.
+With the SQLite backend, a new database file is created for every size, and the statements are the ones the application executed
+(as recorded in its metrics, without the transaction control statements).
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from standins import StandInServer
+
+
+def getQuestions(connection):
+    """Returns the number of statements the MySQL server has received so far, not counting the status query itself."""
+    cursor = connection.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    value = int(cursor.fetchone()[1])
+    cursor.close()
+    return value - 1
+
+
+def getExecutedStatements():
+    """Returns the number of statements the application has executed so far, as recorded in its metrics."""
+    from metrics import metrics
+
+    return sum(entry["calls"] for entry in metrics.getStats() if entry["system"] == "db")
+
+
+def seedDatabase(size, database):
+    """Creates the benchmark database and fills it with 'size' synthetic TV shows, some of them snoozed or with videos."""
+    from dbConnector import getCursor
+    from migrations import runMigrations
+
+    runMigrations()
+
+    tv_shows = []
+    for number in range(1, size + 1):
+        imdb_id = f"tt{8000000 + number:07d}"
+        tv_shows.append((f"Synthetic Show {number}", f"https://www.imdb.com/title/{imdb_id}/", 1 + number % 90 / 10,
+                         f"S{1 + number % 3:02d}E{1 + number % 9:02d}", imdb_id, 8000000 + number, f"{1990 + number % 30}-06-01"))
+
+    with getCursor() as cursor:
+        cursor.executemany("INSERT INTO tv_shows (name, link, score, last_watched_episode, imdb_id, tvmaze_id, release_date) "
+                           "VALUES (%s, %s, %s, %s, %s, %s, %s)", tv_shows)
+        cursor.execute("SELECT id FROM tv_shows ORDER BY id")
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany("INSERT INTO snoozed_tv_shows (tv_show_id) VALUES (%s)", [(tv_show_id,) for tv_show_id in ids[::20]])
+        cursor.executemany("INSERT INTO youtube_videos (tv_show_id, season, episode, url, type) VALUES (%s, %s, %s, %s, %s)",
+                           [(tv_show_id, 1, 2, f"https://www.youtube.com/watch?v=seed{tv_show_id}", "seen") for tv_show_id in ids[::10]])
+
+
+def runSize(args):
+    """Runs the benchmark for one size in the current process and prints the results as JSON."""
+    workDirectory = tempfile.mkdtemp(prefix="bingewatch-bench-")
+    standIns = StandInServer(latency=args.latency_ms / 1000, recordings_path=args.recordings, record=args.record)
+    baseUrl = standIns.start()
+
+    config.OMDB_BASE_URL = f"{baseUrl}/omdb"
+    config.TVMAZE_BASE_URL = f"{baseUrl}/tvmaze"
+    # The client appends the service path ('youtube/v3/') of the discovery document to the endpoint.
+    config.YOUTUBE_API_ENDPOINT = f"{baseUrl}/"
+    # Without a key, the client looks for Google application default credentials instead of calling the stand-in.
+    config.YOUTUBE_API_KEY = "benchmark"
+    config.DB_BACKEND = args.backend
+    config.DB_NAME = args.database
+    config.SQLITE_PATH = os.path.join(workDirectory, "bingewatch.db")
+    config.CACHE_DIR = os.path.join(workDirectory, "tvmaze")
+    config.QUOTA_STATE_FILE = os.path.join(workDirectory, "youtube_quota.json")
+    config.YOUTUBE_DAILY_QUOTA = 10 ** 9
+
+    logging.basicConfig(filename=os.path.join(workDirectory, "info.log"), level=logging.INFO, force=True)
+
+    admin = None
+    countStatements = getExecutedStatements
+    if args.backend == "mysql":
+        import mysql.connector
+
+        admin = mysql.connector.connect(host=config.DB_HOST, user=config.DB_USER, password=config.DB_PASSWORD)
+        adminCursor = admin.cursor()
+        adminCursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        adminCursor.execute(f"CREATE DATABASE `{args.database}`")
+        adminCursor.close()
+        countStatements = lambda: getQuestions(admin)
+
+    seedDatabase(args.size, args.database)
+
+    from watchlist import addTVShows
+    from tv_shows import listUnwatchedEpisodes, showNewTVShows, notifyForNewVideos
+
+    entryPoints = [
+        ("addTVShows", addTVShows),
+        ("listUnwatchedEpisodes (cold cache)", listUnwatchedEpisodes),
+        ("listUnwatchedEpisodes (warm cache)", listUnwatchedEpisodes),
+        ("showNewTVShows", showNewTVShows),
+        ("notifyForNewVideos", lambda: notifyForNewVideos("notification"))
+    ]
+
+    results = []
+    for name, function in entryPoints:
+        standIns.resetCounts()
+        statementsBefore = countStatements()
+        started = time.perf_counter()
+        function()
+        duration = time.perf_counter() - started
+        statements = countStatements() - statementsBefore
+        results.append({"size": args.size, "entry_point": name, "seconds": duration,
+                        "upstream_calls": standIns.resetCounts(), "db_statements": statements})
+
+    if admin is not None:
+        admin.close()
+    standIns.stop()
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the startup reports and of a notification poll cycle")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="numbers of synthetic TV shows")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--latency-ms", type=float, default=50, help="latency of every stand-in response")
+    parser.add_argument("--recordings", help="JSON file with recorded upstream responses")
+    parser.add_argument("--record", action="store_true", help="forward unknown requests to the real APIs and save the responses")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql", help="database backend of the benchmark")
+    parser.add_argument("--database", default="bingewatch_bench", help="name of the MySQL benchmark database (dropped and created again)")
+    args = parser.parse_args()
+
+    if args.size is not None:
+        runSize(args)
+        return
+
+    rows = []
+    for size in args.sizes:
+        command = [sys.executable, os.path.abspath(__file__), "--size", str(size), "--latency-ms", str(args.latency_ms),
+                   "--backend", args.backend, "--database", args.database]
+        if args.recordings:
+            command += ["--recordings", args.recordings]
+        if args.record:
+            command.append("--record")
+        output = subprocess.run(command, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        rows += json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'shows':>6}  {'entry point':<36} {'seconds':>9} {'db stmts':>9}  upstream calls")
+    for row in rows:
+        calls = ", ".join(f"{upstream}={count}" for upstream, count in sorted(row["upstream_calls"].items())) or "-"
+        print(f"{row['size']:>6}  {row['entry_point']:<36} {row['seconds']:>9.2f} {row['db_statements']:>9}  {calls}")
+
+
+if __name__ == "__main__":
+    main()
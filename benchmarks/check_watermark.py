@@ -0,0 +1,137 @@
+"""
+Check of the video watermarks, against the YouTube stand-in of 'standins.py'.
+
+A search keeps at most 2 new videos, while the stand-in answers the first query variant of an episode with 5 relevant videos,
+all published at the same time. The watermark of the episode must stay where it is until all of them are saved: if it moved to
+their publishing time after the first poll, the next polls would only ask for newer videos and the other 3 would be lost.
+The check runs notification poll cycles on a new SQLite database until one finds nothing, and verifies that every relevant video
+was saved and that the watermark only moved once they all were.
+
+Usage:
+    python benchmarks/check_watermark.py
+
+The exit status is 1 if the check fails.
+"""
+import logging
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from standins import StandInServer, synthesizeYoutube
+
+SHOW = "Watermark Check"
+SEASON, EPISODE = 1, 2
+MAX_POLLS = 10
+
+
+def getRelevantUrls():
+    """Returns the URLs of the videos the stand-in answers that are relevant to the episode, for all the query variants."""
+    from matcher import TrailerMatcher
+
+    matcher = TrailerMatcher(SHOW, SEASON, EPISODE)
+    queries = [f'"{SHOW}" "s{SEASON:02d}e{EPISODE:02d}"', f'"{SHOW}" "season {SEASON}" "episode {EPISODE}"',
+               f'"{SHOW}" "{SEASON}x{EPISODE:02d}"']
+    urls = set()
+    for query in queries:
+        status, headers, response = synthesizeYoutube({"q": query})
+        urls.update(f"https://www.youtube.com/watch?v={item['id']['videoId']}" for item in matcher.classify(response["items"]))
+    return urls
+
+
+def checkWatermark():
+    """
+    Runs the poll cycles and checks the saved videos and the watermark after each of them.
+
+    Returns:
+        list: A description of every check that failed (empty if all pass).
+    """
+    from dbConnector import getCursor
+    from migrations import runMigrations
+    from tv_shows import notifyForNewVideos
+
+    runMigrations()
+    with getCursor() as cursor:
+        cursor.execute("INSERT INTO tv_shows (name, link, score) VALUES (%s, %s, %s)", (SHOW, "https://www.imdb.com/title/tt7000001/", 8))
+        cursor.execute("SELECT id FROM tv_shows WHERE name = %s", (SHOW,))
+        tv_show_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO youtube_videos (tv_show_id, season, episode, url, type) VALUES (%s, %s, %s, %s, %s)",
+                       (tv_show_id, SEASON, EPISODE, "https://www.youtube.com/watch?v=seen", "seen"))
+
+    def getState():
+        with getCursor() as cursor:
+            cursor.execute("SELECT url FROM youtube_videos WHERE tv_show_id = %s AND type = 'notification'", (tv_show_id,))
+            urls = {row[0] for row in cursor.fetchall()}
+            cursor.execute("SELECT newest_published_at FROM video_watermarks WHERE tv_show_id = %s AND season = %s AND episode = %s",
+                           (tv_show_id, SEASON, EPISODE))
+            row = cursor.fetchone()
+        return urls, row[0] if row else None
+
+    relevantUrls = getRelevantUrls()
+    failures = []
+    if len(relevantUrls) <= 2:
+        return [f"the stand-in answers {len(relevantUrls)} relevant videos, more than 2 are needed to check the limit"]
+
+    for poll in range(1, MAX_POLLS + 1):
+        savedBefore, watermarkBefore = getState()
+        if not notifyForNewVideos("notification"):
+            return failures + [f"poll {poll} failed"]
+        saved, watermark = getState()
+
+        if saved - relevantUrls:
+            failures.append(f"poll {poll} saved videos that are not relevant: {sorted(saved - relevantUrls)}")
+        if watermark is not None and saved != relevantUrls:
+            failures.append(f"poll {poll} moved the watermark to {watermark} with {len(relevantUrls - saved)} relevant videos not saved")
+        if saved == savedBefore:
+            if watermarkBefore is None:
+                failures.append(f"poll {poll} found no new video, but the watermark was never set")
+            break
+    else:
+        failures.append(f"the videos were still not all found after {MAX_POLLS} polls")
+
+    saved, watermark = getState()
+    if saved != relevantUrls:
+        failures.append(f"{len(relevantUrls - saved)} of the {len(relevantUrls)} relevant videos were never saved")
+    if watermark is None:
+        failures.append("the watermark was not set once all the videos were saved")
+    return failures
+
+
+def main():
+    workDirectory = tempfile.mkdtemp(prefix="bingewatch-check-")
+    standIns = StandInServer(latency=0)
+    baseUrl = standIns.start()
+
+    config.OMDB_BASE_URL = f"{baseUrl}/omdb"
+    config.TVMAZE_BASE_URL = f"{baseUrl}/tvmaze"
+    # The client appends the service path ('youtube/v3/') of the discovery document to the endpoint.
+    config.YOUTUBE_API_ENDPOINT = f"{baseUrl}/"
+    # Without a key, the client looks for Google application default credentials instead of calling the stand-in.
+    config.YOUTUBE_API_KEY = "benchmark"
+    config.DB_BACKEND = "sqlite"
+    config.SQLITE_PATH = os.path.join(workDirectory, "bingewatch.db")
+    config.CACHE_DIR = os.path.join(workDirectory, "tvmaze")
+    config.QUOTA_STATE_FILE = os.path.join(workDirectory, "youtube_quota.json")
+    config.YOUTUBE_DAILY_QUOTA = 10 ** 9
+
+    logging.basicConfig(filename=os.path.join(workDirectory, "info.log"), level=logging.INFO, force=True)
+
+    try:
+        failures = checkWatermark()
+    finally:
+        standIns.stop()
+
+    if failures:
+        print("Watermark check failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("Watermark check passed")
+
+
+if __name__ == "__main__":
+    main()
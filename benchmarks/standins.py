@@ -0,0 +1,237 @@
+"""
+Local stand-ins for the OMDB, TVMaze and YouTube Data APIs, used by the benchmarks.
+
+A single HTTP server answers for the three upstreams under different path prefixes:
+    /omdb/...         -> OMDB        (set OMDB_BASE_URL to '<base>/omdb')
+    /tvmaze/...       -> TVMaze      (set TVMAZE_BASE_URL to '<base>/tvmaze')
+    /youtube/v3/...   -> YouTube     (set YOUTUBE_API_ENDPOINT to '<base>/youtube/v3/')
+
+Responses come from a recordings file when it has an entry for the request, and are otherwise synthesized with the same shape
+as the real answers (deterministically, from the ids in the request). In recording mode, requests that are not in the recordings
+are forwarded to the real upstream and its answers are saved, so a later run can replay them offline.
+Every response is delayed by a configurable latency, and the server counts the requests it receives per upstream.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+REAL_UPSTREAMS = {
+    "omdb": "https://www.omdbapi.com",
+    "tvmaze": "https://api.tvmaze.com",
+    "youtube": "https://www.googleapis.com/youtube/v3"
+}
+
+IGNORED_PARAMETERS = {"apikey", "key", "alt"}
+
+
+def getRecordingKey(upstream, path, query):
+    """Returns the key of a request in the recordings: the upstream, the path and the query without credentials, sorted."""
+    parameters = sorted((name, value) for name, values in parse_qs(query).items() if name not in IGNORED_PARAMETERS for value in values)
+    return f"{upstream} {path}?{urlencode(parameters)}"
+
+
+def getNumber(text):
+    """Returns a stable number for an id such as 'tt0944947' or a search query."""
+    digits = "".join(character for character in text if character.isdigit())
+    return int(digits) if digits else int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def synthesizeOmdb(parameters):
+    if "i" in parameters:
+        number = getNumber(parameters["i"])
+        return 200, {}, {
+            "Response": "True",
+            "Title": f"Show {number}",
+            "Released": f"{1 + number % 28:02d} Mar {1995 + number % 30}",
+            "imdbRating": f"{5 + number % 50 / 10:.1f}",
+            "Type": "series"
+        }
+
+    page = int(parameters.get("page", "1"))
+    if page > 100:
+        return 200, {}, {"Response": "False", "Error": "Movie not found!"}
+    return 200, {}, {
+        "Response": "True",
+        "totalResults": "1000",
+        "Search": [{"Title": f"Series {page}-{index}", "imdbID": f"tt9{page:03d}{index:03d}", "Type": "series"} for index in range(10)]
+    }
+
+
+def synthesizeTvmaze(path, parameters, headers):
+    if path == "/lookup/shows":
+        number = getNumber(parameters.get("imdb", ""))
+        return 200, {}, {"id": number, "name": f"Show {number}", "status": "Ended" if number % 3 == 0 else "Running"}
+
+    if path.startswith("/shows/") and path.endswith("/episodes"):
+        number = getNumber(path.split("/")[2])
+        etag = f'"episodes-{number}"'
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, None
+
+        seasons = 1 + number % 8
+        episodes = []
+        for season in range(1, seasons + 1):
+            for episode in range(1, 11):
+                episodes.append({
+                    "id": number * 1000 + season * 100 + episode,
+                    "name": f"Episode {episode}",
+                    "season": season,
+                    "number": episode,
+                    "airdate": f"{2010 + season}-{1 + episode % 12:02d}-15"
+                })
+        return 200, {"ETag": etag}, episodes
+
+    return 404, {}, None
+
+
+def synthesizeYoutube(parameters):
+    query = parameters.get("q", "")
+    show = query.split('"')[1] if query.count('"') >= 2 else query
+    number = getNumber(query)
+    season, episode = 1 + number % 5, 1 + number % 10
+    for part in query.lower().replace('"', " ").split():
+        if part.startswith("s") and "e" in part[1:]:
+            seasonText, episodeText = part[1:].split("e", 1)
+            if seasonText.isdigit() and episodeText.isdigit():
+                season, episode = int(seasonText), int(episodeText)
+
+    publishedAt = "2024-05-01T10:00:00Z"
+    if parameters.get("publishedAfter", "") > publishedAt:
+        return 200, {}, {"kind": "youtube#searchListResponse", "items": []}
+
+    items = []
+    for index in range(5):
+        videoId = hashlib.sha1(f"{query}-{index}".encode("utf-8")).hexdigest()[:11]
+        items.append({
+            "id": {"kind": "youtube#video", "videoId": videoId},
+            "snippet": {
+                "title": f"{show} S{season:02d}E{episode:02d} Trailer #{index + 1}",
+                "description": f"Official preview of season {season}",
+                "channelTitle": "Stand-in Channel",
+                "publishedAt": publishedAt
+            }
+        })
+    return 200, {}, {"kind": "youtube#searchListResponse", "items": items}
+
+
+class StandInServer:
+    """
+    The HTTP server of the stand-ins.
+
+    Args:
+        latency (float): The number of seconds every response is delayed.
+        recordings_path (str): The JSON file with the recorded responses, or 'None'.
+        record (bool): Whether requests missing from the recordings are forwarded to the real upstreams and saved.
+    """
+
+    def __init__(self, latency=0.05, recordings_path=None, record=False):
+        self.latency = latency
+        self.recordings_path = recordings_path
+        self.record = record
+        self.recordings = {}
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.server = None
+
+        if recordings_path:
+            try:
+                with open(recordings_path, "r", encoding="utf-8") as file:
+                    self.recordings = json.load(file)
+            except OSError:
+                self.recordings = {}
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Starts the server on a free local port, in a background thread."""
+        standIns = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                standIns.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="stand-ins", daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        """Stops the server and saves the recordings if new responses were recorded."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.record and self.recordings_path:
+            with open(self.recordings_path, "w", encoding="utf-8") as file:
+                json.dump(self.recordings, file, indent=1, sort_keys=True)
+
+    def resetCounts(self):
+        """Returns the request counts per upstream since the last reset, and resets them."""
+        with self.lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        return counts
+
+    def forward(self, upstream, path, query):
+        import requests
+
+        parameters = {name: values[0] for name, values in parse_qs(query).items()}
+        response = requests.get(REAL_UPSTREAMS[upstream] + path, params=parameters, timeout=30)
+        body = response.json() if response.content else None
+        return response.status_code, {}, body
+
+    def handle(self, request):
+        parts = urlsplit(request.path)
+        path = parts.path
+        if path.startswith("/omdb"):
+            upstream, path = "omdb", path[len("/omdb"):] or "/"
+        elif path.startswith("/tvmaze"):
+            upstream, path = "tvmaze", path[len("/tvmaze"):]
+        elif path.startswith("/youtube/v3"):
+            upstream, path = "youtube", path[len("/youtube/v3"):]
+        else:
+            upstream = None
+
+        with self.lock:
+            self.counts[upstream or "unknown"] += 1
+
+        time.sleep(self.latency)
+
+        key = getRecordingKey(upstream, path, parts.query)
+        parameters = {name: values[0] for name, values in parse_qs(parts.query).items()}
+
+        if key in self.recordings:
+            recorded = self.recordings[key]
+            status, headers, body = recorded["status"], recorded.get("headers", {}), recorded["body"]
+        elif self.record and upstream:
+            status, headers, body = self.forward(upstream, path, parts.query)
+            with self.lock:
+                self.recordings[key] = {"status": status, "headers": headers, "body": body}
+        elif upstream == "omdb":
+            status, headers, body = synthesizeOmdb(parameters)
+        elif upstream == "tvmaze":
+            status, headers, body = synthesizeTvmaze(path, parameters, request.headers)
+        elif upstream == "youtube" and path.startswith("/search"):
+            status, headers, body = synthesizeYoutube(parameters)
+        else:
+            status, headers, body = 404, {}, None
+
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
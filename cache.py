@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from config import CACHE_DIR, CACHE_MAX_ENTRIES, CACHE_INDEX_SAVE_INTERVAL
+import httpClient
+
+
+class ResponseCache:
+    """
+    An on-disk cache for JSON responses of upstream APIs.
+
+    Every entry is kept in its own file inside the cache directory, while a small 'index.json' file keeps the metadata
+    of all the entries (url, the time it was fetched, its TTL, the last time it was used, ETag and Last-Modified headers).
+    Entries are served from disk while they are fresh. Once their TTL expires, they are revalidated with a conditional
+    request, so an unchanged resource costs a '304 Not Modified' answer instead of the whole body.
+    When the cache holds more than 'max_entries' entries, the least recently used ones are evicted. The last use of an entry
+    served from disk is saved with the index at most every 'index_save_interval' seconds.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES, index_save_interval=CACHE_INDEX_SAVE_INTERVAL):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.index_save_interval = index_save_interval
+        self.index_saved_at = time.time()
+        self.index_changes = 0
+        self.index_changes_saved = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.index = self._loadIndex()
+
+    def _indexPath(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _bodyPath(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _loadIndex(self):
+        try:
+            with open(self._indexPath(), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _snapshotIndex(self):
+        """
+        Copies the index so it can be written without holding the lock. It must be called with the lock held.
+
+        Returns:
+            tuple: The number of changes the copy includes and the copy of the index.
+        """
+        self.index_changes += 1
+        self.index_saved_at = time.time()
+        return self.index_changes, {key: dict(entry) for key, entry in self.index.items()}
+
+    def _saveIndex(self, snapshot):
+        """
+        Writes a copy of the index taken by '_snapshotIndex'. It must be called without the lock held, so the lookups of the
+        other threads don't wait for the disk. A copy older than the one already on disk is not written.
+        """
+        changes, index = snapshot
+        with self.save_lock:
+            if changes <= self.index_changes_saved:
+                return
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temporaryPath = self._indexPath() + ".tmp"
+                with open(temporaryPath, "w", encoding="utf-8") as file:
+                    json.dump(index, file)
+                os.replace(temporaryPath, self._indexPath())
+                self.index_changes_saved = changes
+            except OSError as e:
+                logging.warning(f"Error saving the cache index: {e}")
+
+    def _accessTimesSnapshot(self, now):
+        """
+        Returns a copy of the index to save after a cache hit, at most once every 'index_save_interval' seconds, so the LRU
+        order survives a restart. It must be called with the lock held.
+
+        Returns:
+            tuple: The copy to pass to '_saveIndex', or 'None' if the index was saved recently.
+        """
+        if now - self.index_saved_at >= self.index_save_interval:
+            return self._snapshotIndex()
+        return None
+
+    def _readBody(self, key):
+        try:
+            with open(self._bodyPath(key), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _writeBody(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        # Two threads may write the same key at once now that bodies are written outside the lock.
+        temporaryPath = f"{self._bodyPath(key)}.{threading.get_ident()}.tmp"
+        with open(temporaryPath, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporaryPath, self._bodyPath(key))
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits into 'max_entries'."""
+        overflow = len(self.index) - self.max_entries
+        if overflow <= 0:
+            return
+
+        oldestKeys = sorted(self.index, key=lambda key: self.index[key]["last_access"])[:overflow]
+        for key in oldestKeys:
+            del self.index[key]
+            try:
+                os.remove(self._bodyPath(key))
+            except OSError:
+                pass
+
+    def getVersion(self, url):
+        """
+        Returns the time when the cached copy of 'url' was fetched, if that copy is still fresh.
+
+        It lets callers that keep structures derived from a response reuse them as long as the response didn't change.
+
+        Args:
+            url (str): The URL of the resource.
+
+        Returns:
+            float: The timestamp of the cached copy, or 'None' if there is no fresh copy of the resource.
+        """
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or time.time() - entry["fetched_at"] >= entry["ttl"]:
+                return None
+            return entry["fetched_at"]
+
+    def fetchJson(self, url, ttl):
+        """
+        Returns the JSON body of 'url', using the cached copy when possible.
+
+        Args:
+            url (str): The URL of the resource.
+            ttl (int): How many seconds the response is considered fresh.
+
+        Returns:
+            The decoded JSON body, or 'None' if the resource doesn't exist (a '404 Not Found' answer and no cached copy).
+
+        Exceptions:
+            requests.exceptions.RequestException: If the request fails or gets an error answer and there is no cached copy
+            to fall back on.
+        """
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        now = time.time()
+
+        snapshot = None
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is not None:
+                entry["ttl"] = ttl
+                entry["last_access"] = now
+                snapshot = self._accessTimesSnapshot(now)
+        if snapshot is not None:
+            self._saveIndex(snapshot)
+
+        # The bodies are read and written outside the lock, so the concurrent lookups don't wait for each other's disk I/O.
+        if entry is not None and now - entry["fetched_at"] < ttl:
+            data = self._readBody(key)
+            if data is not None:
+                return data
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = httpClient.get(url, headers=headers)
+        except requests.exceptions.RequestException as e:
+            data = self._readBody(key) if entry is not None else None
+            if data is None:
+                raise
+            logging.warning(f"Request failed for {url}, using the stale cached copy: {e}")
+            return data
+
+        if response.status_code == 304 and entry is not None:
+            data = self._readBody(key)
+            if data is not None:
+                with self.lock:
+                    entry["fetched_at"] = now
+                    snapshot = self._snapshotIndex()
+                self._saveIndex(snapshot)
+                return data
+            # The body of the entry is gone from the disk, so the whole resource is requested again.
+            response = httpClient.get(url)
+
+        if response.status_code != 200:
+            data = self._readBody(key) if entry is not None else None
+            if data is not None:
+                logging.warning(f"{url} answered {response.status_code}, using the stale cached copy")
+                return data
+            if response.status_code == 404:
+                return None
+            raise requests.exceptions.HTTPError(f"{url} answered {response.status_code}", response=response)
+
+        data = response.json()
+        self._writeBody(key, data)
+        with self.lock:
+            self.index[key] = {
+                "url": url,
+                "fetched_at": now,
+                "last_access": now,
+                "ttl": ttl,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+            self._evict()
+            snapshot = self._snapshotIndex()
+        self._saveIndex(snapshot)
+        return data
+
+
+tvmazeCache = ResponseCache()
@@ -0,0 +1,207 @@
+import logging
+from tv_shows import addTVshow, addLastWatchedEpisode, updateScore, setDate, deleteTVShow, snoozeATVShow, unsnoozeATVShow, \
+    listNewVideos, see_notifications, markVideosAsSeen, backfillTVShowDetails
+from imdb import getShowDetails
+from config import NOTIFICATION_PAGE_SIZE
+from metrics import metrics
+from utils import verifyEpisodeFormat, verifyDateFormat
+from dbConnector import getAllTVShowsInTheDB
+from watchlist import importWatchlist, exportWatchlist
+
+
+class Command:
+    """
+    A command of the interpreter.
+
+    A line is handled by the command when it starts with the words of 'prefix' and has between 'min_words' and 'max_words' words
+    (the prefix included).
+
+    Args:
+        prefix (tuple): The first words of the command.
+        handler (function): The function that runs the command; it receives the words of the line and returns whether the command succeeded.
+        usage (str): How the command is used.
+        min_words (int): The minimum number of words of the line.
+        max_words (int): The maximum number of words of the line, or 'None' for no limit.
+        ignore_case (bool): Whether the prefix is matched regardless of case.
+    """
+
+    def __init__(self, prefix, handler, usage, min_words=None, max_words=None, ignore_case=False):
+        self.prefix = prefix
+        self.handler = handler
+        self.usage = usage
+        self.min_words = min_words if min_words is not None else len(prefix)
+        self.max_words = max_words
+        self.ignore_case = ignore_case
+
+    def matches(self, args):
+        words = [arg.lower() for arg in args[:len(self.prefix)]] if self.ignore_case else args[:len(self.prefix)]
+        return (tuple(words) == self.prefix and len(args) >= self.min_words
+                and (self.max_words is None or len(args) <= self.max_words))
+
+
+class ParsedCommand:
+    """A line of input matched to its command, ready to be run (possibly later and more than once)."""
+
+    def __init__(self, line, command, args, line_number=None):
+        self.line = line
+        self.command = command
+        self.args = args
+        self.line_number = line_number
+
+    def run(self):
+        """
+        Runs the command. The errors are handled and logged by the command itself.
+
+        Returns:
+            bool: 'True' if the command succeeded, 'False' if it failed.
+        """
+        return self.command.handler(self.args)
+
+
+def addCommand(args):
+    imdb_link = args[1]
+    score = float(args[2])
+    details = getShowDetails(imdb_link)
+    tv_show_name = details['title'] if details else None
+    logging.info(f"TV Show Name: {tv_show_name}")
+    return addTVshow(tv_show_name, imdb_link, score, details['release_date'] if details else None)
+
+
+def importCommand(args):
+    counts = importWatchlist(" ".join(args[1:]))
+    return counts is not None and counts["failed"] == 0
+
+
+def exportCommand(args):
+    return exportWatchlist(" ".join(args[1:])) is not None
+
+
+def statsCommand(args):
+    """Logs the number of calls, the errors and the latencies of every upstream endpoint and database statement, the slowest in total first."""
+    stats = metrics.getStats()
+    if not stats:
+        logging.info("No calls recorded yet")
+        return True
+    lines = [f"{'system':<8} {'calls':>7} {'errors':>6} {'total s':>8} {'avg ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}  operation"]
+    for entry in stats:
+        lines.append(f"{entry['system']:<8} {entry['calls']:>7} {entry['errors']:>6} {entry['total_duration']:>8.2f} "
+                     f"{entry['average_duration'] * 1000:>8.1f} {entry['p50'] * 1000:>8.1f} {entry['p95'] * 1000:>8.1f} "
+                     f"{entry['max_duration'] * 1000:>8.1f}  {entry['operation']}")
+    logging.info("Call statistics:\n" + "\n".join(lines))
+    return True
+
+
+def backfillCommand(args):
+    return backfillTVShowDetails()
+
+
+def deleteCommand(args):
+    return deleteTVShow(" ".join(args[1:]))
+
+
+def printTVShowsCommand(args):
+    tv_shows = getAllTVShowsInTheDB()
+    for index, tv_show in enumerate(tv_shows, start=1):
+        logging.info(f"{index}. {tv_show}")
+    return True
+
+
+def seeNotificationsCommand(args):
+    """Pages through the new videos. The page size is only read from the '--page' option, so a TV show named with a number (e.g. "24") is a filter."""
+    page_size = NOTIFICATION_PAGE_SIZE
+    filters = args[2:]
+    if filters and filters[0] == "--page":
+        if len(filters) < 2 or not filters[1].isdigit() or int(filters[1]) <= 0:
+            logging.error("Error: invalid page size! Usage: see notifications [--page <page size>] [<TV Show Name>]")
+            return False
+        page_size = int(filters[1])
+        filters = filters[2:]
+    tv_show_name = " ".join(filters) or None
+    last_id = see_notifications(page_size, tv_show_name)
+    if last_id is not None:
+        return markVideosAsSeen(last_id, tv_show_name)
+    return True
+
+
+def updateEpisodeCommand(args):
+    last_watched_episode = args[-1]
+    tv_show_name = " ".join(args[2:-1])
+    if verifyEpisodeFormat(last_watched_episode):
+        return addLastWatchedEpisode(last_watched_episode, tv_show_name)
+    logging.error("Error: Invalid episode format! Usage: update episode <TV Show Name> S<season>E<episode>")
+    return False
+
+
+def updateScoreCommand(args):
+    return updateScore(args[2], " ".join(args[3:]))
+
+
+def setDateCommand(args):
+    date = args[2]
+    if not verifyDateFormat(date):
+        logging.error("Error: invalid date format. Usage: year-month-day (yyyy-mm-dd)!")
+        return False
+    return setDate(date, " ".join(args[3:]))
+
+
+def snoozeCommand(args):
+    return snoozeATVShow(" ".join(args[1:]))
+
+
+def unsnoozeCommand(args):
+    return unsnoozeATVShow(" ".join(args[1:]))
+
+
+def listTrailersCommand(args):
+    """Searches the trailers of an episode. Every call costs three YouTube searches (see 'listNewVideos')."""
+    try:
+        command_str = " ".join(args[2:])
+        if 'Season:' in command_str and 'Episode:' in command_str:
+            tv_show_name = command_str.split('Season:')[0].strip()
+            season_str = command_str.split('Season:')[1].split('Episode:')[0].strip()
+            episode_str = command_str.split('Episode:')[1].strip()
+            season = int(season_str)
+            episode = int(episode_str)
+            return listNewVideos(tv_show_name, season, episode, "trailer")
+        logging.error("Error: Invalid command! Usage: list trailers <TV Show Name> Season:<Number> Episode:<Number>")
+        return False
+
+    except (ValueError, IndexError) as e:
+        logging.error(f"Error: {e}")
+        return False
+
+
+COMMANDS = [
+    Command(("add",), addCommand, "add <IMDb link> <score>", min_words=3, max_words=3),
+    Command(("import",), importCommand, "import <file.csv|file.json>", min_words=2),
+    Command(("export",), exportCommand, "export <file.csv|file.json>", min_words=2),
+    Command(("stats",), statsCommand, "stats", max_words=1, ignore_case=True),
+    Command(("backfill",), backfillCommand, "backfill", max_words=1, ignore_case=True),
+    Command(("delete",), deleteCommand, "delete <TV Show Name>", min_words=2),
+    Command(("print", "tv", "shows"), printTVShowsCommand, "print tv shows", ignore_case=True),
+    Command(("see", "notifications"), seeNotificationsCommand, "see notifications [--page <page size>] [<TV Show Name>]", ignore_case=True),
+    Command(("update", "episode"), updateEpisodeCommand, "update episode <TV Show Name> S<season>E<episode>", min_words=4),
+    Command(("update", "score"), updateScoreCommand, "update score <score> <TV Show Name>", min_words=4),
+    Command(("set", "date"), setDateCommand, "set date <yyyy-mm-dd> <TV Show Name>", min_words=4),
+    Command(("snooze",), snoozeCommand, "snooze <TV Show Name>", min_words=2),
+    Command(("unsnooze",), unsnoozeCommand, "unsnooze <TV Show Name>", min_words=2),
+    Command(("list", "trailers"), listTrailersCommand, "list trailers <TV Show Name> Season:<Number> Episode:<Number>", min_words=5)
+]
+
+
+def parseCommand(line, line_number=None):
+    """
+    Finds the command of a line of input.
+
+    Args:
+        line (str): The line, as typed or read from a script.
+        line_number (int): The number of the line in its script, if it was read from one.
+
+    Returns:
+        ParsedCommand: The command and the words of the line, or 'None' if no command matches the line.
+    """
+    args = line.split()
+    for command in COMMANDS:
+        if args and command.matches(args):
+            return ParsedCommand(line, command, args, line_number)
+    return None
@@ -1,2 +1,50 @@
 API_KEY=""
 YOUTUBE_API_KEY=""
+
+OMDB_BASE_URL="https://www.omdbapi.com"
+TVMAZE_BASE_URL="http://api.tvmaze.com"
+YOUTUBE_API_ENDPOINT=None
+
+DB_BACKEND="mysql"
+SQLITE_PATH="bingewatch.db"
+
+DB_HOST="localhost"
+DB_USER="root"
+DB_PASSWORD="stud"
+DB_NAME="bingewatch"
+
+CACHE_DIR=".cache/tvmaze"
+CACHE_MAX_ENTRIES=2000
+CACHE_INDEX_SAVE_INTERVAL=60
+TVMAZE_LOOKUP_TTL=30*24*3600
+TVMAZE_EPISODES_TTL_RUNNING=12*3600
+TVMAZE_EPISODES_TTL_ENDED=30*24*3600
+
+MAX_WORKERS=8
+IMPORT_CHUNK_SIZE=500
+SEED_WATCHLIST_FILE="seed_watchlist.csv"
+HOST_RATE_LIMITS={"api.tvmaze.com": (2.0, 20), "www.omdbapi.com": (10.0, 10)}
+
+DB_POOL_SIZE=10
+
+HTTP_CONNECT_TIMEOUT=3.05
+HTTP_READ_TIMEOUT=15
+HTTP_MAX_RETRIES=3
+HTTP_BACKOFF_FACTOR=0.5
+HTTP_POOL_SIZE=16
+
+NOTIFY_INTERVAL=120
+NOTIFICATION_PAGE_SIZE=50
+YOUTUBE_DAILY_QUOTA=10000
+YOUTUBE_SEARCH_COST=100
+QUOTA_STATE_FILE=".cache/youtube_quota.json"
+EPISODE_REFRESH_INTERVAL=3600
+SNAPSHOT_FILE=".cache/startup_snapshot.json"
+
+METRICS_FILE=".cache/metrics.prom"
+METRICS_EXPORT_INTERVAL=60
+METRICS_BUCKETS=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+LOG_FILE="info.log"
+LOG_MAX_BYTES=5*1024*1024
+LOG_BACKUP_COUNT=5
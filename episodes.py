@@ -0,0 +1,104 @@
+import threading
+from bisect import bisect_left, bisect_right
+from cache import tvmazeCache
+from config import TVMAZE_BASE_URL
+
+
+class EpisodeIndex:
+    """
+    An ordered index over the episode list of a TV show, keyed by (season, number).
+
+    The episodes are sorted once when the index is built, so finding the episode that follows a given one
+    or counting the episodes left is a binary search instead of a scan over the whole list.
+    Episodes without a season or an episode number (e.g. specials) are left out.
+    """
+
+    def __init__(self, episode_list):
+        episodes = [episode for episode in episode_list
+                    if episode.get('season') is not None and episode.get('number') is not None]
+        episodes.sort(key=lambda episode: (episode['season'], episode['number']))
+
+        self.episodes = episodes
+        self.keys = [(episode['season'], episode['number']) for episode in episodes]
+
+    def getEpisode(self, season, number):
+        """
+        Returns the given episode.
+
+        Args:
+            season (int): The season of the episode.
+            number (int): The number of the episode in its season.
+
+        Returns:
+            dict: The TVMaze details of the episode, or 'None' if the show has no such episode.
+        """
+        position = bisect_left(self.keys, (season, number))
+        if position < len(self.keys) and self.keys[position] == (season, number):
+            return self.episodes[position]
+        return None
+
+    def nextEpisode(self, season, number):
+        """
+        Returns the first episode that comes after the given one.
+
+        Args:
+            season (int): The season of the last watched episode.
+            number (int): The number of the last watched episode in its season.
+
+        Returns:
+            dict: The TVMaze details of the next episode, or 'None' if there are no more episodes.
+        """
+        position = bisect_right(self.keys, (season, number))
+        return self.episodes[position] if position < len(self.episodes) else None
+
+    def remainingEpisodes(self, season, number):
+        """
+        Returns how many episodes come after the given one.
+
+        Args:
+            season (int): The season of the last watched episode.
+            number (int): The number of the last watched episode in its season.
+
+        Returns:
+            int: The number of episodes left to watch.
+        """
+        return len(self.keys) - bisect_right(self.keys, (season, number))
+
+
+episodeIndexes = {}
+episodeIndexesLock = threading.Lock()
+
+
+def getEpisodeIndex(tvmaze_id, ttl):
+    """
+    Returns the episode index of a TV show, building it only when the episode list has changed.
+
+    The index is kept in memory together with the version of the cached TVMaze response it was built from,
+    so it is reused for as long as that response is fresh.
+
+    Args:
+        tvmaze_id (int): The TVMaze id of the TV show.
+        ttl (int): How many seconds the episode list of the show is considered fresh.
+
+    Returns:
+        EpisodeIndex: The index over the episodes of the TV show.
+
+    Exceptions:
+        requests.exceptions.RequestException: If the episode list has to be requested and the request fails or gets an
+        error answer, and there is no cached copy to fall back on.
+    """
+    url = f"{TVMAZE_BASE_URL}/shows/{tvmaze_id}/episodes"
+    version = tvmazeCache.getVersion(url)
+
+    with episodeIndexesLock:
+        cached = episodeIndexes.get(tvmaze_id)
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1]
+
+    episode_list = tvmazeCache.fetchJson(url, ttl)
+    # 'None' only means that TVMaze has no such show; a failed request raises instead of looking like an empty list.
+    index = EpisodeIndex(episode_list if episode_list is not None else [])
+
+    with episodeIndexesLock:
+        episodeIndexes[tvmaze_id] = (tvmazeCache.getVersion(url), index)
+    return index
@@ -0,0 +1,89 @@
+import re
+from urllib.parse import urlsplit, parse_qs
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import OMDB_BASE_URL, TVMAZE_BASE_URL, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_POOL_SIZE
+from utils import hostRateLimiter
+from metrics import metrics
+
+
+def createSession():
+    """
+    Creates the HTTP session shared by all the calls to the upstream APIs (OMDB and TVMaze).
+
+    The session keeps the connections alive in a pool per host, so the TCP and TLS handshakes are paid once per connection
+    instead of once per request. Requests that fail with a connection error, '429 Too Many Requests' or a 5xx answer are retried
+    with exponential backoff, honouring the 'Retry-After' header when the server sends one.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+
+    newSession = requests.Session()
+    newSession.mount("http://", adapter)
+    newSession.mount("https://", adapter)
+    return newSession
+
+
+session = createSession()
+
+
+def getOperation(url):
+    """
+    Returns the system and the endpoint of an upstream URL, as they are recorded in the metrics.
+
+    The ids in the path are replaced by '{id}' and only the names of the query parameters are kept, so all the calls to an endpoint
+    are counted together (e.g. ('tvmaze', '/shows/{id}/episodes') or ('omdb', '/?apikey&i')).
+
+    Args:
+        url (str): The requested URL.
+
+    Returns:
+        tuple: The system ('omdb', 'tvmaze' or the host of the URL) and the endpoint.
+    """
+    for system, base_url in (("omdb", OMDB_BASE_URL), ("tvmaze", TVMAZE_BASE_URL)):
+        if url.startswith(base_url):
+            rest = url[len(base_url):]
+            break
+    else:
+        parts = urlsplit(url)
+        system, rest = parts.netloc, url.split(parts.netloc, 1)[1]
+
+    parts = urlsplit(rest)
+    endpoint = re.sub(r"/\d+(?=/|$)", "/{id}", parts.path) or "/"
+    if parts.query:
+        endpoint += "?" + "&".join(sorted(parse_qs(parts.query, keep_blank_values=True)))
+    return system, endpoint
+
+
+def get(url, headers=None):
+    """
+    Sends a GET request through the shared session, respecting the rate limit of the host and the configured timeouts.
+
+    The call is recorded in the metrics; exceptions, '429' and 5xx answers count as errors.
+
+    Args:
+        url (str): The URL to request.
+        headers (dict): Additional request headers.
+
+    Returns:
+        requests.Response: The response of the server.
+
+    Exceptions:
+        requests.exceptions.RequestException: If the request still fails after the retries or times out.
+    """
+    hostRateLimiter.wait(url)
+    with metrics.timed(*getOperation(url)) as outcome:
+        response = session.get(url, headers=headers, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        outcome["error"] = response.status_code == 429 or response.status_code >= 500
+    return response
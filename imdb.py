@@ -1,170 +1,289 @@
 import logging
 from datetime import datetime
 import requests
-from config import API_KEY
+from config import API_KEY, OMDB_BASE_URL, TVMAZE_BASE_URL, TVMAZE_LOOKUP_TTL, TVMAZE_EPISODES_TTL_RUNNING, TVMAZE_EPISODES_TTL_ENDED, MAX_WORKERS
+from cache import tvmazeCache
+from episodes import getEpisodeIndex
+import httpClient
+from concurrent.futures import ThreadPoolExecutor
 
-def getNameFromLink(imdb_link):
+def parseReleaseDate(release_date_raw):
     """
-    Retrieves the title of a TV show from an IMDb link using the OMDB API.
+    Converts a release date as returned by the OMDB API (e.g. "17 Apr 2011") into the 'YYYY-MM-DD' format.
 
-    This function extracts the IMDb ID from the provided IMDb link and then uses the OMDB API to retrieve the corresponding title of the TV show.
-    If successful, it returns the title, otherwise it returns 'None'.
+    Args:
+        release_date_raw (str): The 'Released' field of an OMDB response.
+
+    Returns:
+        str: The release date in 'YYYY-MM-DD' format, or 'None' if the date is missing or can't be parsed.
+    """
+    try:
+        return datetime.strptime(release_date_raw, "%d %b %Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def getShowDetails(imdb_link):
+    """
+    Retrieves the details of a TV show from an IMDb link using the OMDB API.
+
+    This function extracts the IMDb ID from the provided IMDb link and then uses the OMDB API to retrieve the title and the release date of the TV show.
 
     Args:
         imdb_link (str): The IMDb URL of the TV show or movie.
 
     Returns:
-        str: The title of the TV show or movie, or 'None' if there was an error during the request.
+        dict: A dictionary with the 'title', 'imdb_id' and 'release_date' ('YYYY-MM-DD' or 'None') of the TV show, or 'None' if there was an error during the request.
 
     Exceptions:
         Exception: If there is an issue with fetching data from the OMDB API.
     """
     imdbID = imdb_link.split("/")[-2]
-    url = f"https://www.omdbapi.com/?i={imdbID}&apikey={API_KEY}"
+    url = f"{OMDB_BASE_URL}/?i={imdbID}&apikey={API_KEY}"
 
     try:
-        response = requests.get(url)
+        response = httpClient.get(url)
         data = response.json()
 
         if data.get('Response') == 'True':
-            return data.get('Title')
+            return {
+                'title': data.get('Title'),
+                'imdb_id': imdbID,
+                'release_date': parseReleaseDate(data.get('Released'))
+            }
         else:
             raise Exception(f"Error fetching data: {data.get('Error')}")
     except requests.exceptions.RequestException as e:
         logging.error(f"Request error: {e}")
         return None
 
-def getNextEpisode(link, last_episode_watched):
+
+def getEpisodesTTL(tvmaze_status):
+    """
+    Returns how many seconds the TVMaze episode list of a TV show is kept in the cache.
+
+    Args:
+        tvmaze_status (str): The TVMaze status of the TV show (e.g. "Running" or "Ended"), if known.
+
+    Returns:
+        int: 'TVMAZE_EPISODES_TTL_ENDED' for a show that has ended, 'TVMAZE_EPISODES_TTL_RUNNING' otherwise.
+    """
+    return TVMAZE_EPISODES_TTL_ENDED if tvmaze_status == 'Ended' else TVMAZE_EPISODES_TTL_RUNNING
+
+
+def getTVMazeShow(imdbID):
+    """
+    Looks up the TVMaze id and status of a TV show by its IMDb ID.
+
+    Args:
+        imdbID (str): The IMDb ID of the TV show (e.g. "tt0944947").
+
+    Returns:
+        dict: The 'id' and the 'status' of the TV show on TVMaze, or 'None' if TVMaze doesn't know the show or the request failed.
+    """
+    url = f"{TVMAZE_BASE_URL}/lookup/shows?imdb={imdbID}"
+
+    try:
+        data = tvmazeCache.fetchJson(url, TVMAZE_LOOKUP_TTL)
+        return {'id': data.get('id'), 'status': data.get('status')} if data and data.get('id') else None
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Request failed: {e}")
+        return None
+
+
+def getNextEpisode(link, last_episode_watched, tvmaze_id=None, tvmaze_status=None):
     """
     Retrieves the next episode's details for a given TV show using its IMDb link.
 
     Using the TVMaze API, this function finds the next episode of a TV show based on the last episode watched.
+    The TVMaze responses are served from the on-disk cache while they are fresh: the IMDb lookup is kept for a long time,
+    while the episode list of a show that is still running expires sooner than the one of a show that has ended.
     The IMDb link identifies the show, and the last episode watched helps determine which episode to fetch.
+    When the TVMaze id of the show is already known, the IMDb lookup is skipped and the stored status chooses the TTL instead.
+    The episodes are looked up in an index ordered by (season, number) that is built once per show and reused,
+    so the next episode is always the one right after the last watched one, even across seasons.
 
     Args:
         link (str): IMDb URL for the TV show.
         last_episode_watched (str): The last episode watched, in the format "SxxExx" (e.g., "S01E05").
+        tvmaze_id (int): The TVMaze id of the TV show, if it is stored in the database.
+        tvmaze_status (str): The TVMaze status of the TV show, stored with the id.
 
     Returns:
-        dict: A dictionary with details of the next episode, such as the title, season, and episode number, or 'None' if the next episode is not found.
+        dict: A dictionary with details of the next episode, such as the title, season, episode number and the number of episodes left, or 'None' if the next episode is not found.
 
     Exceptions:
-        requests.exceptions.RequestException: If there is an error during the HTTP request.
+        requests.exceptions.RequestException: If there is an error during the HTTP request and no cached copy to fall back on,
+        so a failed lookup is not mistaken for a show without more episodes.
     """
     imdbID = link.split("/")[-2]
-    url = f"http://api.tvmaze.com/lookup/shows?imdb={imdbID}"
-
-    try:
-        response = requests.get(url)
-        data = response.json()
-
-        if response.status_code == 200 and data:
-            tv_show_id = data.get('id')
-            if tv_show_id:
-                episodes_url = f"http://api.tvmaze.com/shows/{tv_show_id}/episodes"
-                episodes_response = requests.get(episodes_url)
-                episode_list = episodes_response.json()
-
-                season_number, episode_number = map(int, last_episode_watched[1:].split('E'))
-                next_episode_details = None
-
-                for episode in episode_list:
-                    episode_season = episode['season']
-                    episode_episode_number = episode['number']
-                    if episode_season == season_number and episode_episode_number == episode_number + 1:
-                        next_episode_details = episode
-                        break
-                    elif episode_season == season_number + 1 and episode_episode_number == 1:
-                        next_episode_details = episode
-                        break
-
-                if next_episode_details:
-                    next_episode_info = {
-                        'title': next_episode_details['name'],
-                        'season': next_episode_details['season'],
-                        'episode': next_episode_details['number'],
-                        'imdbID': imdbID
-                    }
-                    return next_episode_info
-                else:
-                    return None
-
+    url = f"{TVMAZE_BASE_URL}/lookup/shows?imdb={imdbID}"
+
+    if tvmaze_id:
+        data = {'id': tvmaze_id, 'status': tvmaze_status}
+    else:
+        data = tvmazeCache.fetchJson(url, TVMAZE_LOOKUP_TTL)
+
+    if data:
+        tv_show_id = data.get('id')
+        if tv_show_id:
+            episode_index = getEpisodeIndex(tv_show_id, getEpisodesTTL(data.get('status')))
+
+            season_number, episode_number = map(int, last_episode_watched[1:].split('E'))
+            next_episode_details = episode_index.nextEpisode(season_number, episode_number)
+
+            if next_episode_details:
+                next_episode_info = {
+                    'title': next_episode_details['name'],
+                    'season': next_episode_details['season'],
+                    'episode': next_episode_details['number'],
+                    'imdbID': imdbID,
+                    'remaining': episode_index.remainingEpisodes(season_number, episode_number)
+                }
+                return next_episode_info
             else:
-                logging.error(f"Error: Couldn't find TV Show id for {imdbID}")
                 return None
 
         else:
-            logging.error(f"Error fetching data for {imdbID}: {data.get('Error', 'Unknown Error')}")
+            logging.error(f"Error: Couldn't find TV Show id for {imdbID}")
             return None
 
+    else:
+        logging.error(f"Error fetching data for {imdbID}: TV Show not found on TVMaze")
+        return None
+
+
+def getEpisodeAirDate(tvmaze_id, season, episode, tvmaze_status=None):
+    """
+    Retrieves the air date of an episode from the (cached) TVMaze episode list of the TV show.
+
+    Args:
+        tvmaze_id (int): The TVMaze id of the TV show.
+        season (int): The season number.
+        episode (int): The episode number.
+        tvmaze_status (str): The TVMaze status of the TV show, which chooses how long its episode list is cached.
+
+    Returns:
+        str: The air date in 'YYYY-MM-DD' format, or 'None' if it is unknown.
+    """
+    if not tvmaze_id:
+        return None
+
+    try:
+        episode_details = getEpisodeIndex(tvmaze_id, getEpisodesTTL(tvmaze_status)).getEpisode(season, episode)
+        if episode_details and episode_details.get('airdate'):
+            return episode_details['airdate']
+        return None
     except requests.exceptions.RequestException as e:
         logging.error(f"Request failed: {e}")
         return None
 
 
-def fetchNewShowsFromIMDB(min_date, min_score):
+def fetchSearchPage(page):
+    """
+    Requests one page of TV series from the OMDB search API.
+
+    Args:
+        page (int): The number of the page.
+
+    Returns:
+        dict: The decoded OMDB response.
+
+    Exceptions:
+        requests.exceptions.RequestException: If there is an issue making the request to the OMDB API.
+    """
+    url = f"{OMDB_BASE_URL}/?apikey={API_KEY}&s=series&type=series&page={page}"
+    return httpClient.get(url).json()
+
+
+def fetchShowCandidate(imdb_id):
+    """
+    Requests the details of a TV show found by the search and extracts its title, score and release date.
+
+    Args:
+        imdb_id (str): The IMDb ID of the TV show.
+
+    Returns:
+        dict: The title, score, release date ('YYYY-MM-DD') and IMDb link of the TV show, or 'None' if the details couldn't be fetched.
+    """
+    try:
+        details_url = f"{OMDB_BASE_URL}/?apikey={API_KEY}&i={imdb_id}"
+        show_details = httpClient.get(details_url).json()
+        release_date_raw = show_details.get("Released", "2000-01-01")
+        if release_date_raw == "N/A":
+            release_date = "2000-01-01"
+        else:
+            release_date = datetime.strptime(release_date_raw, "%d %b %Y").strftime("%Y-%m-%d")
+
+        score_str = show_details.get("imdbRating", "0")
+        if score_str == "N/A":
+            score = 0.0
+        else:
+            score = float(score_str)
+
+        return {
+            "title": show_details.get("Title"),
+            "score": score,
+            "release_date": release_date,
+            "link": f"https://www.imdb.com/title/{imdb_id}/"
+        }
+    except Exception as e:
+        logging.error(f"Error fetching details for {imdb_id}: {e}")
+        return None
+
+
+def fetchNewShowsFromIMDB(min_date, min_score, max_workers=MAX_WORKERS):
     """
     Fetches a list of new TV shows from IMDb, filtered by release date and IMDb rating.
 
     This function queries the OMDB API for new TV shows and filters the results based on the specified minimum release date and IMDb score.
+    The details of the shows found on a page are requested concurrently, while the next page of the search is already being fetched.
+    As soon as 15 shows qualify, the crawl stops and the requests that are still waiting are cancelled.
     The results are sorted by release date.
 
     Args:
         min_date (str): The earliest release date for the TV shows, formatted as "YYYY-MM-DD".
         min_score (float): The minimum IMDb rating required for the shows.
+        max_workers (int): The maximum number of requests sent to the OMDB API at the same time.
 
     Returns:
-        list: A list of dictionaries, each containing the title, release date, IMDb rating, and IMDb link for the new shows.
-
-    Exceptions:
-        requests.exceptions.RequestException: If there is an issue making requests to the OMDB API.
+        list: A list of dictionaries, each containing the title, release date, IMDb rating, and IMDb link for the new shows,
+        or 'None' if the search failed (a request error, or an error answer for the first page), so a failed crawl is not mistaken
+        for a crawl that found nothing.
     """
     new_shows = []
     page = 1
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
 
     try:
+        page_future = executor.submit(fetchSearchPage, page)
+
         while len(new_shows) < 15:
-            url = f"https://www.omdbapi.com/?apikey={API_KEY}&s=series&type=series&page={page}"
-            response = requests.get(url)
-            data = response.json()
-            #logging.info(data)
+            data = page_future.result()
 
             if data.get("Response") == "True":
-                for item in data.get("Search", []):
-                    imdb_id = item.get("imdbID")
-                    try:
-                        show_details = requests.get(f"https://www.omdbapi.com/?apikey={API_KEY}&i={imdb_id}").json()
-                        release_date_raw = show_details.get("Released", "2000-01-01")
-                        if release_date_raw == "N/A":
-                            release_date = "2000-01-01"
-                        else:
-                            release_date = datetime.strptime(release_date_raw, "%d %b %Y").strftime("%Y-%m-%d")
-
-                        score_str = show_details.get("imdbRating", "0")
-                        if score_str == "N/A":
-                            score = 0.0
-                        else:
-                            score = float(score_str)
-
-                        if release_date > min_date and score > min_score:
-                            new_shows.append({
-                                "title": show_details.get("Title"),
-                                "score": score,
-                                "release_date": release_date,
-                                "link": f"https://www.imdb.com/title/{imdb_id}/"
-                            })
-                    except Exception as e:
-                        logging.error(f"Error fetching details for {imdb_id}: {e}")
-                        continue
+                page += 1
+                page_future = executor.submit(fetchSearchPage, page)
+
+                detail_futures = [executor.submit(fetchShowCandidate, item.get("imdbID")) for item in data.get("Search", [])]
+                for detail_future in detail_futures:
+                    show = detail_future.result()
+                    if show and show["release_date"] > min_date and show["score"] > min_score:
+                        new_shows.append(show)
+                        if len(new_shows) >= 15:
+                            break
             else:
                 logging.error(f"No results found on page {page}: {data.get('Error')}")
+                if page == 1:
+                    return None
                 break
 
-            page += 1
-
     except requests.exceptions.RequestException as e:
         logging.error(f"Request error: {e}")
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     new_shows.sort(key=lambda x: x["release_date"], reverse=True)
     logging.info(f"Found {len(new_shows)} new shows")
-    return new_shows[:15]
\ No newline at end of file
+    return new_shows[:15]
@@ -0,0 +1,82 @@
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+
+# The attributes every LogRecord has; anything else on a record was passed with 'extra' and is written as a field of its own.
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats every record as one JSON object per line.
+
+    The object has the 'time' (UTC, ISO 8601), 'level', 'thread' and 'message' of the record, followed by the structured fields
+    given with 'extra' (for example 'show', 'season', 'episode' or 'duration').
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = value
+        return json.dumps(entry, default=str)
+
+
+class RecordQueueHandler(QueueHandler):
+    """
+    A QueueHandler that keeps the message and the traceback of a record apart, so the writer thread can put them in separate fields.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setupLogging(path=LOG_FILE, level=logging.INFO, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """
+    Sends the log records of the application through a queue to a dedicated writer thread.
+
+    The threads that log (the command prompt, the scheduler, the startup reports) only put the record on the queue; the writer thread
+    formats it as a JSON line and appends it to 'path', which is rotated once it grows over 'max_bytes' ('backup_count' old files are kept).
+
+    Args:
+        path (str): The log file.
+        level (int): The lowest level that is logged.
+        max_bytes (int): The size at which the file is rotated.
+        backup_count (int): The number of rotated files that are kept.
+
+    Returns:
+        logging.handlers.QueueListener: The started writer; 'stop()' it on exit, so the queued records are written.
+    """
+    fileHandler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    fileHandler.setFormatter(JsonLinesFormatter())
+
+    records = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(RecordQueueHandler(records))
+    root.setLevel(level)
+
+    listener = QueueListener(records, fileHandler, respect_handler_level=True)
+    listener.start()
+    return listener
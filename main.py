@@ -1,133 +1,279 @@
+import argparse
 import logging
+import sys
+import time
 
-from bingeWatchProject.tv_shows import deleteTVShow
 logging.getLogger('googleapiclient.discovery_cache').setLevel(logging.ERROR)
-import threading
-from tv_shows import showNewTVShows, addTVshow, addLastWatchedEpisode, updateScore, setDate, listUnwatchedEpisodes, \
-    snoozeATVShow, unsnoozeATVShow, listNewVideos, see_notifications, \
-    markVideosAsSeen, notifyForNewVideos
-from imdb import getNameFromLink
-from utils import verifyEpisodeFormat, verifyDateFormat
-from dbConnector import createTable, addTVShows, createTableForSnoozedTVShows, createTableForVideos, checkIfTableExists, getAllTVShowsInTheDB
+from tv_shows import showNewTVShows, listUnwatchedEpisodes, notifyForNewVideos, refreshEpisodeIndexes, getUnwatchedEpisodes, \
+    logUnwatchedEpisode, getNewTVShows, logRecommendedTVShow
+from config import NOTIFY_INTERVAL, EPISODE_REFRESH_INTERVAL, METRICS_FILE, METRICS_EXPORT_INTERVAL
+from scheduler import scheduler, BackgroundTask
+from metrics import metrics
+from logSetup import setupLogging
+from snapshot import loadSnapshot, saveSnapshot, getSnapshotAge, diffEntries
+from dbConnector import transaction, DatabaseError
+from watchlist import addTVShows
+from migrations import runMigrations
+from commands import parseCommand
 
-logging.basicConfig(filename='info.log', level=logging.INFO, format='%(asctime)s - %(message)s', force=True)
 
 
 def notify_for_new_videos():
-    """The function sends a notification when new videos are found using the notifyForNewVideos() function and runs every 2 minutes."""
-    try:
-        notifyForNewVideos("notification")
-        logging.info("Notification check completed.")
-    except Exception as e:
-        logging.error(f"Error in notifyForNewVideos: {e}")
+    """The function sends a notification when new videos are found using the notifyForNewVideos() function."""
+    succeeded = notifyForNewVideos("notification")
+    logging.info("Notification check completed.")
+    return succeeded
+
+def export_metrics():
+    """This writes the call metrics to the Prometheus text file."""
+    return metrics.writePrometheusFile(METRICS_FILE)
+
+def start_background_jobs():
+    """This registers the periodic jobs (the notification check every 2 minutes, the hourly refresh of the episode lists and the export of the metrics) and starts the scheduler."""
+    scheduler.addJob("notifications", notify_for_new_videos, NOTIFY_INTERVAL)
+    scheduler.addJob("episode refresh", refreshEpisodeIndexes, EPISODE_REFRESH_INTERVAL, run_immediately=False)
+    scheduler.addJob("metrics export", export_metrics, METRICS_EXPORT_INTERVAL, run_immediately=False)
+    scheduler.start()
+
+def stop_background_jobs():
+    """This stops the scheduler, letting the running job finish, logs the timing statistics of the jobs and writes the metrics file a last time."""
+    scheduler.stop()
+    export_metrics()
+    for stats in scheduler.getStats():
+        average = f"{stats['average_duration']:.2f}s" if stats['average_duration'] is not None else "-"
+        logging.info(f"Job '{stats['name']}': {stats['runs']} runs, {stats['failures']} failures, average {average}, max {stats['max_duration']:.2f}s")
+
+
+def report_unwatched_episodes(snapshot):
+    """
+    This refreshes the next episode report. Without a snapshot the whole report is streamed to the log; otherwise only the
+    TV shows whose entry changed since the snapshot are logged. The refreshed report is saved as the new snapshot, unless
+    the next episode of a TV show couldn't be requested: then the saved snapshot is kept as it is.
+    """
+    if snapshot is None:
+        entries = listUnwatchedEpisodes()
+        if not any(entry.get('error') for entry in entries):
+            saveSnapshot("episodes", entries)
+        return
+
+    entries = list(getUnwatchedEpisodes())
+    if any(entry.get('error') for entry in entries):
+        logging.error("Couldn't refresh the next episode report, the saved one is kept")
+        return
+
+    added, removed, changed = diffEntries(snapshot["entries"], entries, "name")
+    if added or changed:
+        logging.info("Updated episodes for TV shows:\n")
+        for entry in added + [new for old, new in changed]:
+            logUnwatchedEpisode(entry)
+    for entry in removed:
+        logging.info(f"{entry['name']} is no longer in the next episode list")
+    if not (added or removed or changed):
+        logging.info("The next episode list is up to date")
+    saveSnapshot("episodes", entries)
+
+
+def report_new_tv_shows(snapshot):
+    """
+    This refreshes the recommendations. Without a snapshot all of them are logged; otherwise only the TV shows that were
+    added to or removed from the recommendations since the snapshot are logged. The result is saved as the new snapshot,
+    unless the search failed: then the saved snapshot is kept as it is.
+    """
+    if snapshot is None:
+        new_shows = showNewTVShows()
+        if new_shows is not None:
+            saveSnapshot("recommendations", new_shows)
+        return
+
+    latest_date, average_score, new_shows = getNewTVShows()
+    if new_shows is None:
+        logging.error("Couldn't refresh the recommended TV shows, the saved ones are kept")
+        return
 
-    threading.Timer(120, notify_for_new_videos).start()
+    added, removed, changed = diffEntries(snapshot["entries"], new_shows, "link")
+    if added or changed:
+        logging.info("Updated TV Shows recommended:")
+        for show in added + [new for old, new in changed]:
+            logRecommendedTVShow(show)
+    for show in removed:
+        logging.info(f"{show['title']} is no longer recommended")
+    if not (added or removed or changed):
+        logging.info("The recommended TV shows are up to date")
+    saveSnapshot("recommendations", new_shows)
 
-def start_notification_thread():
-    """This starts a background thread that runs the 'notify_for_new_videos' function periodically."""
-    notification_thread = threading.Thread(target=notify_for_new_videos, daemon=True)
-    notification_thread.start()
+
+def show_snapshot(episodes, recommendations):
+    """This logs the saved reports right away, so the last known state is visible while they are refreshed."""
+    if episodes is not None:
+        logging.info(f"Episodes for TV shows (saved {getSnapshotAge(episodes)} ago, refreshing):\n")
+        for entry in episodes["entries"]:
+            logUnwatchedEpisode(entry)
+
+    if recommendations is not None:
+        logging.info(f"TV Shows recommended (saved {getSnapshotAge(recommendations)} ago, refreshing):")
+        for show in recommendations["entries"]:
+            logRecommendedTVShow(show)
+
+
+def start_startup_reports():
+    """
+    This starts the startup work in the background, so the command prompt is available right away.
+
+    The reports saved by the last run are logged at once. The seed TV shows are added first; the next episode report and the
+    recommendations are then refreshed in parallel, and only what changed since the saved reports is logged.
+
+    Returns:
+        dict: The background tasks by name ('seed', 'episodes', 'recommendations').
+    """
+    episodes = loadSnapshot("episodes")
+    recommendations = loadSnapshot("recommendations")
+    show_snapshot(episodes, recommendations)
+
+    seed = BackgroundTask("seed", addTVShows)
+    return {
+        "seed": seed,
+        "episodes": BackgroundTask("episodes", lambda: report_unwatched_episodes(episodes), dependencies=(seed,)),
+        "recommendations": BackgroundTask("recommendations", lambda: report_new_tv_shows(recommendations), dependencies=(seed,))
+    }
 
 
 def main():
-    """Initiates the program, checks if any database tables are necessary, and processes user input commands for managing TV shows and videos."""
+    """
+    Initiates the program, brings the database schema up to date, and processes user input commands for managing TV shows and videos.
+
+    Returns:
+        int: The exit status: 1 if the database schema couldn't be brought up to date, 0 otherwise.
+    """
     logging.info("Start")
-    try:
-        if not checkIfTableExists('tv_shows'):
-            createTable()
-        if not checkIfTableExists('snoozed_tv_shows'):
-            createTableForSnoozedTVShows()
-        if not checkIfTableExists('youtube_videos'):
-            createTableForVideos()
-    except Exception as e:
-        logging.error(f"Error creating tables: {e}")
+    if not runMigrations():
+        logging.error("The database schema couldn't be brought up to date, exiting")
+        return 1
 
-    addTVShows()
-    listUnwatchedEpisodes()
-    showNewTVShows()
-    start_notification_thread()
+    startup_tasks = start_startup_reports()
+    start_background_jobs()
 
     while True:
         try:
             cmd = input("-> ").strip()
+        except EOFError:
+            cmd = "exit"
+
+        try:
             if cmd.lower() == "exit":
+                stop_background_jobs()
                 logging.info("End")
-                break
+                return 0
+            if not cmd:
+                continue
 
-            args = cmd.split()
             logging.info(f"Entered command: <{cmd}>")
 
-            if args[0] == "add" and len(args) == 3:
-                imdb_link = args[1]
-                score = float(args[2])
-                tv_show_name = getNameFromLink(imdb_link)
-                logging.info(f"TV Show Name: {tv_show_name}")
-                addTVshow(tv_show_name, imdb_link, score)
-
-            elif args[0]=="delete" and len(args)>=2:
-                tv_show_name = " ".join(args[1:])
-                deleteTVShow(tv_show_name)
-
-            elif " ".join(args[:3]).lower() == "print tv shows":
-                tv_shows = getAllTVShowsInTheDB()
-                for index, tv_show in enumerate(tv_shows, start=1):
-                    logging.info(f"{index}. {tv_show}")
-
-            elif " ".join(args[:2]).lower() == "see notifications":
-                logging.info(see_notifications())
-                markVideosAsSeen()
-
-            elif args[:2] == ["update", "episode"] and len(args) >= 4:
-                last_watched_episode = args[-1]
-                tv_show_name = " ".join(args[2:-1])
-                if verifyEpisodeFormat(last_watched_episode):
-                    addLastWatchedEpisode(last_watched_episode, tv_show_name)
-                else:
-                    logging.error("Error: Invalid episode format! Usage: update episode <TV Show Name> S<season>E<episode>")
-
-            elif args[:2] == ["update", "score"] and len(args) >= 4:
-                tv_show_name = " ".join(args[3:])
-                score = args[2]
-                updateScore(score, tv_show_name)
-
-            elif args[:2] == ["set", "date"] and len(args) >= 4:
-                tv_show_name = " ".join(args[3:])
-                date = args[2]
-                if not verifyDateFormat(date):
-                    logging.error("Error: invalid date format. Usage: year-month-day (yyyy-mm-dd)!")
-                    continue
-                setDate(date, tv_show_name)
-
-            elif args[0] == "snooze" and len(args) >= 2:
-                tv_show_name = " ".join(args[1:])
-                snoozeATVShow(tv_show_name)
-
-            elif args[0] == "unsnooze" and len(args) >= 2:
-                tv_show_name = " ".join(args[1:])
-                unsnoozeATVShow(tv_show_name)
-
-            elif args[:2] == ['list', 'trailers'] and len(args) >= 5:
-                try:
-                    command_str = " ".join(args[2:])
-                    if 'Season:' in command_str and 'Episode:' in command_str:
-                        tv_show_name = command_str.split('Season:')[0].strip()
-                        season_str = command_str.split('Season:')[1].split('Episode:')[0].strip()
-                        episode_str = command_str.split('Episode:')[1].strip()
-                        season = int(season_str)
-                        episode = int(episode_str)
-                        listNewVideos(tv_show_name, season, episode, "trailer")
-                    else:
-                        logging.error("Error: Invalid command! Usage: list trailers <TV Show Name> Season:<Number> Episode:<Number>")
-
-                except (ValueError, IndexError) as e:
-                    logging.error(f"Error: {e}")
-
-            else:
+            if not startup_tasks["seed"].wait(0):
+                logging.info("Waiting for the TV shows to be loaded...")
+                startup_tasks["seed"].wait()
+
+            command = parseCommand(cmd)
+            if command is None:
                 logging.error(f"Invalid command: <{cmd}>")
+                continue
+            command.run()
 
         except Exception as e:
             logging.error(f"Error: {e}")
 
 
+def read_batch(lines):
+    """
+    This parses the commands of a batch script once, before any of them runs. Blank lines and lines starting with '#' are
+    skipped, and the script ends at an 'exit' line.
+
+    Args:
+        lines (iterable): The lines of the script.
+
+    Returns:
+        tuple: The parsed commands (list of ParsedCommand) and the number of invalid lines, which are logged and left out.
+    """
+    commands = []
+    invalid = 0
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.lower() == "exit":
+            break
+        command = parseCommand(line, number)
+        if command is None:
+            logging.error(f"Invalid command at line {number}: <{line}>", extra={"line": number})
+            invalid += 1
+            continue
+        commands.append(command)
+    return commands, invalid
+
+
+def run_batch(lines):
+    """
+    This runs a script of commands without the prompt, for scheduled jobs (for example a nightly sync that pipes hundreds of
+    'update episode' commands).
+
+    The schema is brought up to date and the seed TV shows are added, but the startup reports and the background jobs are not
+    started. All the commands run in one transaction on one connection, committed once at the end; a command that fails (it
+    reports the failure or raises) is rolled back on its own and the next ones still run.
+
+    Args:
+        lines (iterable): The lines of the script (see 'read_batch').
+
+    Returns:
+        int: The exit status: 0 if every line was valid and ran, 1 otherwise.
+    """
+    logging.info("Start batch")
+    if not runMigrations():
+        logging.error("The database schema couldn't be brought up to date, exiting")
+        return 1
+    addTVShows()
+
+    commands, failed = read_batch(lines)
+    started = time.perf_counter()
+    try:
+        with transaction():
+            for command in commands:
+                try:
+                    if not command.run():
+                        logging.error(f"Command at line {command.line_number} failed: <{command.line}>", extra={"line": command.line_number})
+                        failed += 1
+                except Exception as e:
+                    logging.error(f"Error at line {command.line_number} <{command.line}>: {e}", extra={"line": command.line_number})
+                    failed += 1
+    except DatabaseError as error:
+        logging.error(f"Error at committing the batch: {error}")
+        return 1
+    finally:
+        export_metrics()
+
+    duration = time.perf_counter() - started
+    logging.info(f"Batch completed: {len(commands)} commands in {duration:.2f}s, {failed} failed",
+                 extra={"commands": len(commands), "failed": failed, "duration": duration})
+    return 1 if failed else 0
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Keeps track of the TV shows you watch and the new videos about them.")
+    parser.add_argument("--batch", metavar="FILE", nargs="?", const="-",
+                        help="run the commands of FILE ('-' or no FILE for the standard input) without the prompt, then exit")
+    arguments = parser.parse_args()
+
+    log_listener = setupLogging()
+    try:
+        if arguments.batch is None:
+            status = main()
+        elif arguments.batch == "-":
+            status = run_batch(sys.stdin)
+        else:
+            try:
+                with open(arguments.batch, "r", encoding="utf-8") as script:
+                    status = run_batch(script)
+            except OSError as error:
+                logging.error(f"Error reading the batch script '{arguments.batch}': {error}")
+                status = 1
+    finally:
+        log_listener.stop()
+    sys.exit(status)
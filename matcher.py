@@ -0,0 +1,99 @@
+import re
+
+EPISODE_PATTERN = re.compile(r"""
+      \bs(?P<full_season>\d{1,2})\s*\.?\s*e(?P<full_episode>\d{1,3})\b
+    | \bseason\s*(?P<long_season>\d{1,2})\W{0,3}(?:episode|ep)\.?\s*(?P<long_episode>\d{1,3})\b
+    | \b(?P<cross_season>\d{1,2})x(?P<cross_episode>\d{1,3})\b
+    | \bseason\s*(?P<season>\d{1,2})\b
+    | \bs(?P<short_season>\d{1,2})\b
+    | \b(?:episode|ep)\.?\s*(?P<episode>\d{1,3})\b
+""", re.VERBOSE)
+
+# Groups that close a (season, episode) alternative, and groups of the season-only alternatives.
+FULL_MATCH_GROUPS = {EPISODE_PATTERN.groupindex[name] for name in ("full_episode", "long_episode", "cross_episode")}
+SEASON_GROUPS = {EPISODE_PATTERN.groupindex[name] for name in ("season", "short_season")}
+
+DESCRIPTION_SEASON_PATTERN = re.compile(r"\bseason\s*(\d{1,2})\b")
+
+
+def parseSeasonAndEpisode(text):
+    """
+    Finds the season and the episode mentioned in a (lowercase) video title.
+
+    The first pattern that gives both the season and the episode ('s01e02', 'season 1 episode 2', '1x02') wins.
+    Otherwise, the first season ('season 1', 's1') and the first episode ('episode 2', 'ep2') found are combined.
+
+    Args:
+        text (str): The lowercase text to search.
+
+    Returns:
+        tuple: The season and the episode (each one is 'None' if it isn't mentioned).
+    """
+    season = None
+    episode = None
+
+    for match in EPISODE_PATTERN.finditer(text):
+        group = match.lastindex
+        if group in FULL_MATCH_GROUPS:
+            return int(match.group(group - 1)), int(match.group(group))
+        if group in SEASON_GROUPS:
+            if season is None:
+                season = int(match.group(group))
+        elif episode is None:
+            episode = int(match.group(group))
+
+    return season, episode
+
+
+class TrailerMatcher:
+    """
+    Decides which YouTube videos are about a given TV show, season and episode.
+
+    It is built once per searched episode and reused for all the results. A video is relevant when its title contains the name of the show
+    and mentions the target season (if the title doesn't mention a season, the description is checked), and, when the title mentions an episode,
+    that episode is the target one.
+    """
+
+    def __init__(self, showName, targetSeason, targetEpisode):
+        self.showNameLower = showName.lower()
+        self.targetSeason = targetSeason
+        self.targetEpisode = targetEpisode
+
+    def isRelevant(self, videoTitle, videoDescription=""):
+        """
+        Checks a single video.
+
+        Args:
+            videoTitle (str): The title of the YouTube video.
+            videoDescription (str): The description of the YouTube video.
+
+        Returns:
+            bool: True if the video matches the TV show, season and episode, False otherwise.
+        """
+        titleLower = videoTitle.lower()
+        if self.showNameLower not in titleLower:
+            return False
+
+        foundSeason, foundEpisode = parseSeasonAndEpisode(titleLower)
+
+        if foundSeason is None:
+            match = DESCRIPTION_SEASON_PATTERN.search(videoDescription.lower())
+            if match:
+                foundSeason = int(match.group(1))
+
+        if foundSeason != self.targetSeason:
+            return False
+        return foundEpisode is None or foundEpisode == self.targetEpisode
+
+    def classify(self, videoItems):
+        """
+        Keeps the relevant videos of a YouTube 'search.list' answer.
+
+        Args:
+            videoItems (list): The 'items' of the answer.
+
+        Returns:
+            list: The relevant items, in their original order.
+        """
+        return [videoItem for videoItem in videoItems
+                if self.isRelevant(videoItem['snippet']['title'], videoItem['snippet'].get('description', ''))]
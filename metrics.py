@@ -0,0 +1,153 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from config import METRICS_BUCKETS
+
+
+class CallMetric:
+    """The number of calls, the errors and the latency histogram of one operation of one system."""
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+
+
+class Metrics:
+    """
+    Collects the calls made to the systems the application depends on (the upstream APIs and the database).
+
+    Every call is recorded under its system ('omdb', 'tvmaze', 'youtube', 'db') and its operation (an endpoint or a statement),
+    with its duration in a histogram of 'buckets' (upper bounds in seconds) and whether it failed.
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def observe(self, system, operation, duration, error=False):
+        """
+        Records one call.
+
+        Args:
+            system (str): The system that was called.
+            operation (str): The endpoint or statement that was called.
+            duration (float): How many seconds the call took.
+            error (bool): Whether the call failed.
+        """
+        with self.lock:
+            metric = self.metrics.get((system, operation))
+            if metric is None:
+                metric = self.metrics[(system, operation)] = CallMetric(self.buckets)
+            metric.bucket_counts[bisect.bisect_left(self.buckets, duration)] += 1
+            metric.calls += 1
+            metric.errors += bool(error)
+            metric.total_duration += duration
+            metric.max_duration = max(metric.max_duration, duration)
+
+    @contextmanager
+    def timed(self, system, operation):
+        """
+        Records the call made in the block. An exception raised in the block counts as an error and is raised again.
+
+        Yields:
+            dict: A dictionary whose 'error' key can be set to True to record a call that failed without an exception.
+        """
+        outcome = {"error": False}
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except Exception:
+            outcome["error"] = True
+            raise
+        finally:
+            self.observe(system, operation, time.perf_counter() - started, outcome["error"])
+
+    def _getQuantile(self, metric, quantile):
+        """Returns the upper bound of the bucket that holds the given quantile of the calls, at most the longest call."""
+        rank = quantile * metric.calls
+        seen = 0
+        for index, count in enumerate(metric.bucket_counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[index], metric.max_duration) if index < len(self.buckets) else metric.max_duration
+        return metric.max_duration
+
+    def getStats(self):
+        """
+        Returns the statistics of every operation called so far, ordered by the total time spent in it.
+
+        Returns:
+            list: Dictionaries with the 'system', 'operation', 'calls', 'errors', 'total_duration', 'average_duration',
+            'p50', 'p95' (upper bounds of the histogram buckets) and 'max_duration' of each operation.
+        """
+        with self.lock:
+            stats = [{
+                "system": system,
+                "operation": operation,
+                "calls": metric.calls,
+                "errors": metric.errors,
+                "total_duration": metric.total_duration,
+                "average_duration": metric.total_duration / metric.calls,
+                "p50": self._getQuantile(metric, 0.5),
+                "p95": self._getQuantile(metric, 0.95),
+                "max_duration": metric.max_duration
+            } for (system, operation), metric in self.metrics.items()]
+        return sorted(stats, key=lambda entry: entry["total_duration"], reverse=True)
+
+    def formatPrometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        def escape(value):
+            return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+        durations = ["# HELP bingewatch_call_duration_seconds Duration of the calls to the upstream APIs and the database.",
+                     "# TYPE bingewatch_call_duration_seconds histogram"]
+        errors = ["# HELP bingewatch_call_errors_total Calls to the upstream APIs and the database that failed.",
+                  "# TYPE bingewatch_call_errors_total counter"]
+
+        with self.lock:
+            for (system, operation), metric in sorted(self.metrics.items()):
+                labels = f'system="{escape(system)}",operation="{escape(operation)}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + [None], metric.bucket_counts):
+                    cumulative += count
+                    le = "+Inf" if bound is None else repr(float(bound))
+                    durations.append(f'bingewatch_call_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                durations.append(f"bingewatch_call_duration_seconds_sum{{{labels}}} {metric.total_duration!r}")
+                durations.append(f"bingewatch_call_duration_seconds_count{{{labels}}} {metric.calls}")
+                errors.append(f"bingewatch_call_errors_total{{{labels}}} {metric.errors}")
+
+        return "\n".join(durations + errors) + "\n"
+
+    def writePrometheusFile(self, path):
+        """
+        Writes the metrics to a Prometheus text file (for example for the textfile collector of the node exporter).
+        The file is replaced atomically, so a scrape never reads a partial file.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            bool: True if the file was written, False otherwise.
+        """
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporaryPath = path + ".tmp"
+            with open(temporaryPath, "w", encoding="utf-8") as file:
+                file.write(self.formatPrometheus())
+            os.replace(temporaryPath, path)
+            return True
+        except OSError as e:
+            logging.error(f"Error writing the metrics file: {e}")
+            return False
+
+
+metrics = Metrics()
@@ -0,0 +1,173 @@
+import logging
+from datetime import datetime
+from dbConnector import getCursor, storage, DatabaseError
+
+
+def createBaseTables(cursor):
+    """
+    Creates the 'tv_shows', 'snoozed_tv_shows' and 'youtube_videos' tables as the first versions of the application did.
+
+    The tables that already exist are kept as they are, so a database created before the migrations is adopted in place.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS tv_shows (
+            id {storage.autoIncrementPrimaryKey},
+            name VARCHAR(255) UNIQUE NOT NULL,
+            link VARCHAR(255) UNIQUE NOT NULL,
+            score FLOAT NOT NULL CHECK(score>=1.0 AND score<=10.0),
+            last_watched_episode VARCHAR(50),
+            date DATE
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS snoozed_tv_shows (
+            id {storage.autoIncrementPrimaryKey},
+            tv_show_id INT UNIQUE,
+            FOREIGN KEY (tv_show_id) REFERENCES tv_shows(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS youtube_videos (
+            id {storage.autoIncrementPrimaryKey},
+            tv_show_id INT NOT NULL,
+            season INT,
+            episode INT,
+            url VARCHAR(255) UNIQUE,
+            type VARCHAR(20),
+            FOREIGN KEY (tv_show_id) REFERENCES tv_shows(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def addTVShowDetailColumns(cursor):
+    """
+    Adds the 'imdb_id', 'tvmaze_id' and 'release_date' columns to 'tv_shows'.
+
+    The values of the existing rows can then be filled in with the 'backfill' command.
+    """
+    columns = {
+        "imdb_id": "VARCHAR(20)",
+        "tvmaze_id": "INT",
+        "release_date": "DATE"
+    }
+
+    existing_columns = storage.getColumns(cursor, "tv_shows")
+    for column, column_type in columns.items():
+        if column not in existing_columns:
+            cursor.execute(f"ALTER TABLE tv_shows ADD COLUMN {column} {column_type}")
+
+
+def createVideoWatermarksTable(cursor):
+    """Creates the 'video_watermarks' table, which keeps the polling state of every (TV show, season, episode)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS video_watermarks (
+            tv_show_id INT NOT NULL,
+            season INT NOT NULL,
+            episode INT NOT NULL,
+            newest_published_at DATETIME,
+            last_polled_at DATETIME,
+            PRIMARY KEY (tv_show_id, season, episode),
+            FOREIGN KEY (tv_show_id) REFERENCES tv_shows(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def addVideoIndexes(cursor):
+    """
+    Adds the secondary indexes of 'youtube_videos'.
+
+    - idx_youtube_videos_episode (tv_show_id, season, episode): the videos of an episode and the distinct episodes with videos.
+    - idx_youtube_videos_type (type, tv_show_id): the pending notifications and marking them as seen.
+    """
+    indexes = {
+        "idx_youtube_videos_episode": "(tv_show_id, season, episode)",
+        "idx_youtube_videos_type": "(type, tv_show_id)"
+    }
+
+    existing_indexes = storage.getIndexes(cursor, "youtube_videos")
+    for index, columns in indexes.items():
+        if index not in existing_indexes:
+            cursor.execute(f"CREATE INDEX {index} ON youtube_videos {columns}")
+
+
+def addNotificationIndex(cursor):
+    """
+    Adds the index idx_youtube_videos_notifications (type, id) to 'youtube_videos', so the pages of notifications are read in id order
+    straight from the index.
+    """
+    if "idx_youtube_videos_notifications" not in storage.getIndexes(cursor, "youtube_videos"):
+        cursor.execute("CREATE INDEX idx_youtube_videos_notifications ON youtube_videos (type, id)")
+
+
+def addTVMazeStatusColumn(cursor):
+    """
+    Adds the 'tvmaze_status' column to 'tv_shows', so the episode lists of the TV shows that have ended are cached longer
+    without looking the show up again. The values of the existing rows are filled in with the 'backfill' command.
+    """
+    if "tvmaze_status" not in storage.getColumns(cursor, "tv_shows"):
+        cursor.execute("ALTER TABLE tv_shows ADD COLUMN tvmaze_status VARCHAR(32)")
+
+
+# The schema versions in the order they are applied. New changes are appended with the next version number; the
+# released ones are never edited. Every step checks what already exists, so it can be run again after an interruption
+# (MySQL commits DDL statements implicitly, so a failed step may be partially applied). The statements must work on every
+# backend of 'storage.py'; what differs between them goes through the storage.
+MIGRATIONS = [
+    (1, "base tables", createBaseTables),
+    (2, "TV show details columns", addTVShowDetailColumns),
+    (3, "video watermarks table", createVideoWatermarksTable),
+    (4, "youtube_videos indexes", addVideoIndexes),
+    (5, "notification feed index", addNotificationIndex),
+    (6, "TVMaze status column", addTVMazeStatusColumn)
+]
+
+
+def getSchemaVersion():
+    """
+    This function returns the schema version of the database.
+
+    Returns:
+        int: The highest migration applied, 0 for an empty database.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the queries.
+    """
+    with getCursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL
+            )
+        """)
+        cursor.execute("SELECT MAX(version) FROM schema_migrations")
+        version = cursor.fetchone()[0]
+    return version or 0
+
+
+def runMigrations():
+    """
+    This function brings the database schema up to date by applying, in order, the migrations it doesn't have yet.
+
+    Each applied migration is recorded in the 'schema_migrations' table. The migrations stop at the first one that fails,
+    so the next start retries it.
+
+    Returns:
+        bool: True if the schema is up to date, False if a migration failed.
+    """
+    try:
+        version = getSchemaVersion()
+        for migration_version, description, migration in MIGRATIONS:
+            if migration_version <= version:
+                continue
+
+            with getCursor() as cursor:
+                migration(cursor)
+                cursor.execute("INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+                               (migration_version, description, datetime.now()))
+            logging.info(f"Database migrated to version {migration_version} ({description})")
+        return True
+
+    except DatabaseError as error:
+        logging.error(f"Error at migrating the database: {error}")
+        return False
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config import YOUTUBE_DAILY_QUOTA, QUOTA_STATE_FILE
+
+try:
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except ZoneInfoNotFoundError:
+    QUOTA_TIMEZONE = None
+
+
+def getQuotaDay(timestamp):
+    """Returns the quota day of a timestamp. The YouTube quota is reset at midnight Pacific Time."""
+    return datetime.fromtimestamp(timestamp, QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+
+def getSecondsUntilReset(timestamp):
+    """Returns how many seconds are left until the next reset of the YouTube quota."""
+    moment = datetime.fromtimestamp(timestamp, QUOTA_TIMEZONE)
+    midnight = (moment + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1.0, (midnight - moment).total_seconds())
+
+
+class QuotaBudget:
+    """
+    The YouTube quota units a single poll cycle is allowed to spend.
+
+    Searches take units from the budget before they are sent and are skipped when the budget can't cover them.
+    """
+
+    def __init__(self, units):
+        self.units = units
+        self.lock = threading.Lock()
+
+    def take(self, units):
+        """
+        Takes 'units' from the budget if they are available.
+
+        Args:
+            units (int): The cost of the operation.
+
+        Returns:
+            bool: True if the units were taken, False if the budget is not enough.
+        """
+        with self.lock:
+            if self.units < units:
+                return False
+            self.units -= units
+            return True
+
+
+class QuotaTracker:
+    """
+    Keeps track of the YouTube quota units spent during the current quota day.
+
+    The state is saved to a JSON file, so a restart doesn't forget what was already spent.
+    """
+
+    def __init__(self, daily_quota=YOUTUBE_DAILY_QUOTA, state_file=QUOTA_STATE_FILE):
+        self.daily_quota = daily_quota
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.state = self._loadState()
+
+    def _loadState(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("day", getQuotaDay(time.time()))
+        state.setdefault("spent", 0)
+        return state
+
+    def _saveState(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            temporaryPath = self.state_file + ".tmp"
+            with open(temporaryPath, "w", encoding="utf-8") as file:
+                json.dump(self.state, file)
+            os.replace(temporaryPath, self.state_file)
+        except OSError as error:
+            logging.error(f"Error saving the YouTube quota state: {error}")
+
+    def _rollOver(self):
+        today = getQuotaDay(time.time())
+        if self.state["day"] != today:
+            self.state["day"] = today
+            self.state["spent"] = 0
+
+    def spend(self, units):
+        """
+        Records that 'units' quota units were spent.
+
+        Args:
+            units (int): The number of units spent.
+        """
+        with self.lock:
+            self._rollOver()
+            self.state["spent"] += units
+            self._saveState()
+
+    def remaining(self):
+        """
+        Returns the quota units left for the current quota day.
+
+        Returns:
+            int: The units that can still be spent today.
+        """
+        with self.lock:
+            self._rollOver()
+            return max(0, self.daily_quota - self.state["spent"])
+
+    def cycleBudget(self, interval):
+        """
+        Returns the budget of one poll cycle, so that the daily quota is spread over the whole day.
+
+        The quota is earned evenly from one reset to the next: a cycle may spend what was earned so far (including the current cycle)
+        minus what was already spent today. Units that a cycle doesn't use are carried over to the next ones.
+
+        Args:
+            interval (int): The number of seconds between two poll cycles.
+
+        Returns:
+            QuotaBudget: The budget of the cycle.
+        """
+        elapsed = 86400 - getSecondsUntilReset(time.time())
+        earned = self.daily_quota * min(1.0, (elapsed + interval) / 86400)
+
+        with self.lock:
+            self._rollOver()
+            spent = self.state["spent"]
+
+        return QuotaBudget(int(max(0, min(self.daily_quota - spent, earned - spent))))
+
+
+def getDaysSince(date_value, now):
+    """Returns how many days passed between a UTC date ('YYYY-MM-DD' string or datetime) and the timestamp 'now', or 'None' if the date is unknown."""
+    if not date_value:
+        return None
+    try:
+        if isinstance(date_value, str):
+            date_value = datetime.strptime(date_value, "%Y-%m-%d")
+        if date_value.tzinfo is None:
+            date_value = date_value.replace(tzinfo=timezone.utc)
+        return max(0.0, (now - date_value.timestamp()) / 86400)
+    except ValueError:
+        return None
+
+
+def getCheckPriority(score, air_date, last_checked, now, newest_published_at=None):
+    """
+    Computes how urgent it is to search for new videos of an episode.
+
+    Episodes of TV shows with a higher score, that aired recently and that weren't checked for a long time come first.
+    Episodes whose newest known video is old are checked less often, since new uploads for them have become unlikely.
+
+    Args:
+        score (float): The score of the TV show.
+        air_date (str): The air date of the episode in 'YYYY-MM-DD' format, or 'None' if it is unknown.
+        last_checked (float): The timestamp of the last check of the episode, or 'None' if it was never checked.
+        now (float): The current timestamp.
+        newest_published_at (datetime): The publishing time of the newest video known for the episode, or 'None'.
+
+    Returns:
+        float: The priority of the check (higher is more urgent).
+    """
+    age_days = getDaysSince(air_date, now)
+    recency = 1 / (1 + (365.0 if age_days is None else age_days) / 30)
+
+    quiet_days = getDaysSince(newest_published_at, now)
+    activity = 1.0 if quiet_days is None else 1 / (1 + quiet_days / 30)
+
+    week = 7 * 86400
+    waited = week if last_checked is None else min(week, now - last_checked)
+
+    return (score or 1.0) * (0.1 + recency) * (0.1 + activity) * waited
+
+
+youtubeQuota = QuotaTracker()
@@ -0,0 +1,196 @@
+import logging
+import random
+import threading
+import time
+
+
+class Job:
+    """
+    A periodic job run by the scheduler, together with its timing statistics.
+
+    After a successful run the job is scheduled again after 'interval' seconds, changed randomly by up to 'jitter' (a fraction of the interval).
+    After a failed run (an exception or a 'False' result) the interval is doubled for every consecutive failure, up to 'max_backoff' seconds.
+    """
+
+    def __init__(self, name, function, interval, jitter, max_backoff, run_immediately):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.next_run = time.monotonic() if run_immediately else time.monotonic() + self._getDelay()
+        self.consecutive_failures = 0
+        self.runs = 0
+        self.failures = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_duration = None
+
+    def _getDelay(self):
+        delay = self.interval
+        if self.consecutive_failures:
+            delay = min(self.max_backoff, self.interval * 2 ** self.consecutive_failures)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run(self):
+        """Runs the job once, records how long it took and schedules the next run."""
+        started = time.monotonic()
+        try:
+            succeeded = self.function() is not False
+        except Exception as error:
+            logging.error(f"Error in the job '{self.name}': {error}")
+            succeeded = False
+
+        duration = time.monotonic() - started
+        logging.info(f"Job '{self.name}' {'finished' if succeeded else 'failed'} in {duration:.2f}s",
+                     extra={'job': self.name, 'duration': duration, 'succeeded': succeeded})
+        self.runs += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.last_duration = duration
+
+        if succeeded:
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+        self.next_run = time.monotonic() + self._getDelay()
+
+    def getStats(self):
+        """
+        Returns the timing statistics of the job.
+
+        Returns:
+            dict: The number of runs and failures, the average, maximum and last duration (in seconds) and the seconds until the next run.
+        """
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "failures": self.failures,
+            "average_duration": self.total_duration / self.runs if self.runs else None,
+            "max_duration": self.max_duration,
+            "last_duration": self.last_duration,
+            "next_run_in": max(0.0, self.next_run - time.monotonic())
+        }
+
+
+class Scheduler:
+    """
+    Runs the periodic background jobs of the application on a single long-lived worker thread.
+
+    Since one thread runs every job, two runs never overlap and the number of threads stays bounded.
+    The worker sleeps until the next job is due, and 'stop' wakes it up so the application can exit cleanly.
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+
+    def addJob(self, name, function, interval, jitter=0.1, max_backoff=3600, run_immediately=True):
+        """
+        Registers a periodic job.
+
+        Args:
+            name (str): The name of the job, used in the logs and the statistics.
+            function (callable): The function to run. A 'False' result or an exception counts as a failure.
+            interval (float): The number of seconds between two runs.
+            jitter (float): The fraction of the interval by which the runs are randomly spread.
+            max_backoff (float): The longest delay (in seconds) between two runs after consecutive failures.
+            run_immediately (bool): Whether the first run happens right away or after one interval.
+        """
+        with self.lock:
+            self.jobs.append(Job(name, function, interval, jitter, max_backoff, run_immediately))
+        self.wake_event.set()
+
+    def start(self):
+        """Starts the worker thread."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._work, name="scheduler", daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=30):
+        """
+        Stops the worker thread, letting the job that is running (if any) finish.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait for the worker.
+        """
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                logging.warning("The scheduler didn't stop in time")
+            self.thread = None
+
+    def getStats(self):
+        """
+        Returns the timing statistics of every job.
+
+        Returns:
+            list: A dictionary of statistics for each job.
+        """
+        with self.lock:
+            return [job.getStats() for job in self.jobs]
+
+    def _work(self):
+        while not self.stop_event.is_set():
+            with self.lock:
+                job = min(self.jobs, key=lambda job: job.next_run, default=None)
+
+            delay = None if job is None else job.next_run - time.monotonic()
+            if delay is None or delay > 0:
+                self.wake_event.wait(delay)
+                self.wake_event.clear()
+                continue
+
+            job.run()
+
+
+class BackgroundTask:
+    """
+    A one-off function run on its own daemon thread, after the tasks it depends on have finished.
+
+    Other threads can wait for the task to finish with 'wait'. Since the thread is a daemon, a task that is still running doesn't keep the application from exiting.
+    """
+
+    def __init__(self, name, function, dependencies=()):
+        self.name = name
+        self.function = function
+        self.dependencies = dependencies
+        self.done = threading.Event()
+        self.duration = None
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        for dependency in self.dependencies:
+            dependency.wait()
+
+        started = time.monotonic()
+        try:
+            self.function()
+        except Exception as error:
+            logging.error(f"Error in the background task '{self.name}': {error}")
+        finally:
+            self.duration = time.monotonic() - started
+            self.done.set()
+
+    def wait(self, timeout=None):
+        """
+        Waits until the task has finished.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait, or 'None' to wait as long as needed.
+
+        Returns:
+            bool: True if the task has finished, False if the timeout expired.
+        """
+        return self.done.wait(timeout)
+
+
+scheduler = Scheduler()
@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import threading
+import time
+from config import SNAPSHOT_FILE
+
+snapshotLock = threading.Lock()
+
+
+def loadSnapshot(section, path=SNAPSHOT_FILE):
+    """
+    Returns a section of the startup snapshot.
+
+    Args:
+        section (str): The name of the section ('episodes' or 'recommendations').
+        path (str): The JSON file of the snapshot.
+
+    Returns:
+        dict: The 'saved_at' timestamp and the 'entries' of the section, or 'None' if the section was never saved.
+    """
+    with snapshotLock:
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file).get(section)
+        except (OSError, ValueError):
+            return None
+
+
+def saveSnapshot(section, entries, path=SNAPSHOT_FILE):
+    """
+    Saves a section of the startup snapshot, together with the current time. The other sections are kept.
+
+    Args:
+        section (str): The name of the section ('episodes' or 'recommendations').
+        entries (list): The JSON serializable entries of the report.
+        path (str): The JSON file of the snapshot.
+    """
+    with snapshotLock:
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            snapshot = {}
+
+        snapshot[section] = {"saved_at": time.time(), "entries": entries}
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporaryPath = path + ".tmp"
+            with open(temporaryPath, "w", encoding="utf-8") as file:
+                json.dump(snapshot, file)
+            os.replace(temporaryPath, path)
+        except OSError as e:
+            logging.warning(f"Couldn't save the startup snapshot: {e}")
+
+
+def getSnapshotAge(snapshot):
+    """Returns a readable age of a snapshot section, such as '5 minutes'."""
+    seconds = max(0, time.time() - snapshot["saved_at"])
+    for unit, length in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= length:
+            count = int(seconds // length)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return "less than a minute"
+
+
+def diffEntries(old_entries, new_entries, key):
+    """
+    Compares the entries of a report with the ones of its snapshot.
+
+    Args:
+        old_entries (list): The entries of the snapshot.
+        new_entries (list): The entries of the refreshed report.
+        key (str): The field that identifies an entry (for example the name of the TV show).
+
+    Returns:
+        tuple: The added entries, the removed entries and the changed entries (as '(old, new)' pairs), in report order.
+    """
+    old_by_key = {entry[key]: entry for entry in old_entries}
+    new_keys = {entry[key] for entry in new_entries}
+
+    added = [entry for entry in new_entries if entry[key] not in old_by_key]
+    removed = [entry for entry in old_entries if entry[key] not in new_keys]
+    changed = [(old_by_key[entry[key]], entry) for entry in new_entries
+               if entry[key] in old_by_key and old_by_key[entry[key]] != entry]
+    return added, removed, changed
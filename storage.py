@@ -0,0 +1,278 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from config import DB_BACKEND, DB_POOL_SIZE, DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, SQLITE_PATH
+
+
+class Storage:
+    """
+    The database the application keeps its data in.
+
+    The queries of the application are written once, with '%s' placeholders and SQL that both backends understand.
+    The few things that differ between the databases (connections, error types, auto-incremented keys, upserts and the
+    inspection of the schema) go through this interface, which each backend implements. Transactions and cursors are built
+    on top of the connections of the backend.
+    """
+
+    name = None
+    Error = Exception
+    IntegrityError = Exception
+    autoIncrementPrimaryKey = None
+
+    def __init__(self):
+        self.local = threading.local()
+
+    @contextmanager
+    def _connection(self):
+        """Yields a connection that is used only by the calling thread until the block ends."""
+        raise NotImplementedError
+
+    def _begin(self, connection):
+        """Starts a transaction on the connection."""
+
+    def _wrapCursor(self, cursor):
+        """Returns the cursor given to the callers, which accepts '%s' placeholders."""
+        return cursor
+
+    def _executeControl(self, connection, statement):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups the statements of the calling thread into one unit of work, committed once when the block ends.
+
+        The 'cursor' blocks opened by the thread inside the block share the connection of the transaction; each of them runs in
+        a savepoint, so a block that fails is rolled back on its own (as it would be without the transaction) and the others are
+        still committed at the end. An exception that leaves the block rolls back the whole transaction.
+        A transaction opened inside another one joins it.
+
+        Raises:
+            Storage.Error: If a connection can't be obtained or the commit fails.
+        """
+        if getattr(self.local, "transaction", None) is not None:
+            yield
+            return
+
+        with self._connection() as connection:
+            self._begin(connection)
+            self.local.transaction = connection
+            self.local.savepoints = 0
+            try:
+                yield
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                self.local.transaction = None
+
+    @contextmanager
+    def cursor(self):
+        """
+        Yields a cursor that is used only by the caller.
+
+        The statements executed in the block are committed when the block ends without errors and rolled back otherwise.
+        Inside a 'transaction' they are only kept or rolled back (through a savepoint), and committed with the transaction.
+
+        Yields:
+            A DB-API cursor that accepts '%s' placeholders.
+
+        Raises:
+            Storage.Error: If a connection can't be obtained or a statement fails.
+        """
+        connection = getattr(self.local, "transaction", None)
+        if connection is None:
+            with self._connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    yield self._wrapCursor(cursor)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+            return
+
+        self.local.savepoints += 1
+        savepoint = f"unit_{self.local.savepoints}"
+        self._executeControl(connection, f"SAVEPOINT {savepoint}")
+        cursor = connection.cursor()
+        try:
+            yield self._wrapCursor(cursor)
+        except Exception:
+            cursor.close()
+            self._executeControl(connection, f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+        cursor.close()
+        self._executeControl(connection, f"RELEASE SAVEPOINT {savepoint}")
+
+    def getColumns(self, cursor, table_name):
+        """Returns the names of the columns of a table."""
+        raise NotImplementedError
+
+    def getIndexes(self, cursor, table_name):
+        """Returns the names of the indexes of a table."""
+        raise NotImplementedError
+
+    def upsertQuery(self, table, columns, key_columns, update_columns):
+        """
+        Returns an INSERT query that updates the existing row instead when a row with the same key already exists.
+
+        Args:
+            table (str): The name of the table.
+            columns (list): The inserted columns, in the order of the query parameters.
+            key_columns (list): The columns of the unique key that identifies an existing row.
+            update_columns (list): The columns that are overwritten on an existing row.
+
+        Returns:
+            str: The query, with one '%s' placeholder per column.
+        """
+        raise NotImplementedError
+
+
+class MySQLStorage(Storage):
+    """
+    A MySQL server, reached through a pool of connections.
+
+    When all the connections are in use, the caller waits until one is returned instead of failing.
+    """
+
+    name = "mysql"
+    autoIncrementPrimaryKey = "INT AUTO_INCREMENT PRIMARY KEY"
+
+    def __init__(self, host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_NAME, pool_size=DB_POOL_SIZE):
+        import mysql.connector
+        from mysql.connector import pooling
+        from mysql.connector.constants import ClientFlag
+
+        super().__init__()
+        self.Error = mysql.connector.Error
+        self.IntegrityError = mysql.connector.IntegrityError
+        # FOUND_ROWS makes 'rowcount' report the rows matched by an UPDATE, even when their values didn't change (as SQLite does).
+        self.connectionPool = pooling.MySQLConnectionPool(pool_name="bingewatch", pool_size=pool_size,
+                                                          host=host, user=user, password=password, database=database,
+                                                          client_flags=[ClientFlag.FOUND_ROWS])
+        self.connectionSlots = threading.BoundedSemaphore(pool_size)
+
+    @contextmanager
+    def _connection(self):
+        with self.connectionSlots:
+            connection = self.connectionPool.get_connection()
+            try:
+                yield connection
+            finally:
+                connection.close()
+
+    def getColumns(self, cursor, table_name):
+        cursor.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                       (table_name,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def getIndexes(self, cursor, table_name):
+        cursor.execute("SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                       (table_name,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def upsertQuery(self, table, columns, key_columns, update_columns):
+        updates = ", ".join(f"{column} = VALUES({column})" for column in update_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+class SQLiteCursor:
+    """A sqlite3 cursor that accepts the '%s' placeholders of the queries of the application."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, parameters=()):
+        return self.cursor.execute(query.replace("%s", "?"), parameters)
+
+    def executemany(self, query, parameters):
+        return self.cursor.executemany(query.replace("%s", "?"), parameters)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class SQLiteStorage(Storage):
+    """
+    An embedded SQLite database file, for single-user installs that don't run a MySQL server.
+
+    Each thread keeps its own connection to the file. The database runs in WAL mode, so the background jobs can read while
+    another thread writes; writers wait for each other for up to 'timeout' seconds.
+    DATE and DATETIME columns are returned as 'date' and 'datetime' objects, as with MySQL.
+    """
+
+    name = "sqlite"
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+    autoIncrementPrimaryKey = "INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    def __init__(self, path=SQLITE_PATH, timeout=30):
+        super().__init__()
+        self.path = path
+        self.timeout = timeout
+
+        sqlite3.register_adapter(date, lambda value: value.isoformat())
+        sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+        sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+        sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+    @contextmanager
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, detect_types=sqlite3.PARSE_DECLTYPES)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self.local.connection = connection
+        yield connection
+
+    def _begin(self, connection):
+        # Without an explicit BEGIN, the first savepoint would start the transaction and releasing it would commit.
+        self._executeControl(connection, "BEGIN")
+
+    def _wrapCursor(self, cursor):
+        return SQLiteCursor(cursor)
+
+    def getColumns(self, cursor, table_name):
+        cursor.execute("SELECT name FROM pragma_table_info(%s)", (table_name,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def getIndexes(self, cursor, table_name):
+        cursor.execute("SELECT name FROM pragma_index_list(%s)", (table_name,))
+        return {row[0] for row in cursor.fetchall()}
+
+    def upsertQuery(self, table, columns, key_columns, update_columns):
+        updates = ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+
+def createStorage(backend=DB_BACKEND):
+    """
+    Creates the storage selected by 'DB_BACKEND' in the configuration.
+
+    Args:
+        backend (str): 'mysql' or 'sqlite'.
+
+    Returns:
+        Storage: The storage of the application.
+
+    Raises:
+        ValueError: If the backend is not known.
+    """
+    if backend == "mysql":
+        return MySQLStorage()
+    if backend == "sqlite":
+        return SQLiteStorage()
+    raise ValueError(f"Unknown database backend: {backend}")
@@ -1,32 +1,104 @@
 import logging
 logging.getLogger('googleapiclient.discovery_cache').setLevel(logging.ERROR)
-from dbConnector import myCursor, myDB
-import mysql.connector
+from dbConnector import getCursor, transaction, storage, DatabaseError, IntegrityError
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from datetime import datetime
-from imdb import fetchNewShowsFromIMDB, getNextEpisode
-from config import API_KEY
+from config import MAX_WORKERS, NOTIFY_INTERVAL, NOTIFICATION_PAGE_SIZE, YOUTUBE_SEARCH_COST
+from episodes import getEpisodeIndex
+from imdb import fetchNewShowsFromIMDB, getNextEpisode, getShowDetails, getTVMazeShow, getEpisodeAirDate, getEpisodesTTL
+from quota import youtubeQuota, getCheckPriority
 from videos import searchTrailers
 
-def addTVshow(name, imdb_link, score):
+# The default release date of 'addTVshow', for callers that haven't asked OMDB yet (a 'None' date means OMDB has none).
+NOT_FETCHED = object()
+
+
+def addTVshow(name, imdb_link, score, release_date=NOT_FETCHED):
     """
     This function inserts a new TV show into the 'tv_shows' table of the database.
 
+    The IMDb ID, the TVMaze id and status and the release date of the TV show are resolved when the show is added and are stored with it,
+    so they don't have to be requested again from the APIs later.
+
     Args:
         name (str): The name of the TV show.
         imdb_link (str): The IMDb URL associated with the TV show.
         score (float): The rating assigned to the TV show.
+        release_date (str): The release date of the TV show in 'YYYY-MM-DD' format ('None' if it has none), if already fetched.
+
+    Returns:
+        bool: 'True' if the TV show was added, 'False' otherwise.
 
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the insert query.
+        DatabaseError: If an error occurs while executing the insert query.
     """
+    imdb_id = imdb_link.split("/")[-2]
+    tvmaze_show = getTVMazeShow(imdb_id) or {}
+
+    if release_date is NOT_FETCHED:
+        details = getShowDetails(imdb_link)
+        release_date = details['release_date'] if details else None
+
     try:
-        query="INSERT INTO tv_shows (name, link, score) VALUES (%s, %s, %s)"
-        myCursor.execute(query, (name, imdb_link, score))
-        myDB.commit()
-        logging.info(f"Tv show '{name}' added")
-    except mysql.connector.Error as error:
+        with getCursor() as cursor:
+            query = ("INSERT INTO tv_shows (name, link, score, imdb_id, tvmaze_id, tvmaze_status, release_date) "
+                     "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+            cursor.execute(query, (name, imdb_link, score, imdb_id, tvmaze_show.get('id'), tvmaze_show.get('status'), release_date))
+            logging.info(f"Tv show '{name}' added")
+        return True
+    except DatabaseError as error:
         logging.error(f"Error at adding the tv show: {error}")
+        return False
+
+
+def backfillTVShowDetails():
+    """
+    This function fills in the IMDb ID, the TVMaze id and status and the release date of the TV shows that were added without them.
+
+    Only the rows that have at least one of these columns missing are resolved, so running it again is cheap.
+
+    Returns:
+        bool: 'True' if the details were saved, 'False' otherwise.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the queries.
+    """
+    try:
+        with getCursor() as cursor:
+            cursor.execute("SELECT id, name, link, imdb_id, tvmaze_id, tvmaze_status, release_date FROM tv_shows "
+                           "WHERE imdb_id IS NULL OR tvmaze_id IS NULL OR tvmaze_status IS NULL OR release_date IS NULL")
+            results = cursor.fetchall()
+
+        if not results:
+            logging.info("All the TV shows are up to date")
+            return True
+
+        updates = []
+        for tv_show_id, name, link, imdb_id, tvmaze_id, tvmaze_status, release_date in results:
+            imdb_id = imdb_id or link.split("/")[-2]
+            if tvmaze_id is None or tvmaze_status is None:
+                tvmaze_show = getTVMazeShow(imdb_id) or {}
+                tvmaze_id = tvmaze_id or tvmaze_show.get('id')
+                tvmaze_status = tvmaze_status or tvmaze_show.get('status')
+
+            if release_date is None:
+                try:
+                    details = getShowDetails(link)
+                    release_date = details['release_date'] if details else None
+                except Exception as e:
+                    logging.error(f"Error fetching the details of '{name}': {e}")
+
+            updates.append((imdb_id, tvmaze_id, tvmaze_status, release_date, tv_show_id))
+
+        with getCursor() as cursor:
+            cursor.executemany("UPDATE tv_shows SET imdb_id=%s, tvmaze_id=%s, tvmaze_status=%s, release_date=%s WHERE id=%s", updates)
+        logging.info(f"Details updated for {len(updates)} TV shows")
+        return True
+    except DatabaseError as error:
+        logging.error(f"Error at backfilling the TV shows: {error}")
+        return False
 
 
 def addLastWatchedEpisode(episode, tv_show_name):
@@ -37,23 +109,25 @@ def addLastWatchedEpisode(episode, tv_show_name):
         episode (str): The last episode watched, formatted as 'SxxExx'.
         tv_show_name (str): The name of the TV show.
 
+    Returns:
+        bool: 'True' if the episode was updated, 'False' otherwise.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the update query.
+        DatabaseError: If an error occurs while executing the update query.
     """
     try:
-        myCursor.execute("SELECT * FROM tv_shows WHERE name=%s", (tv_show_name,))
-        result=myCursor.fetchone()
-
-        if result is None:
-            logging.error(f"Error: '{tv_show_name}' not found in the database")
-            return
-
-        query="UPDATE tv_shows SET last_watched_episode=%s WHERE name=%s"
-        myCursor.execute(query, (episode, tv_show_name))
-        myDB.commit()
-        logging.info(f"Episode '{episode}' updated for '{tv_show_name}'")
-    except mysql.connector.Error as error:
+        with getCursor() as cursor:
+            query="UPDATE tv_shows SET last_watched_episode=%s WHERE name=%s"
+            cursor.execute(query, (episode, tv_show_name))
+
+            if cursor.rowcount == 0:
+                logging.error(f"Error: '{tv_show_name}' not found in the database")
+                return False
+            logging.info(f"Episode '{episode}' updated for '{tv_show_name}'")
+        return True
+    except DatabaseError as error:
         logging.error(f"Error updating the last watched episode: {error}")
+        return False
 
 def updateScore(score, tv_show_name):
     """
@@ -63,24 +137,26 @@ def updateScore(score, tv_show_name):
         score (float): The new score to be assigned to the TV show.
         tv_show_name (str): The name of the TV show.
 
+    Returns:
+        bool: 'True' if the score was updated, 'False' otherwise.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the update query.
+        DatabaseError: If an error occurs while executing the update query.
     """
     try:
-        myCursor.execute("SELECT * FROM tv_shows WHERE name=%s", (tv_show_name,))
-        result=myCursor.fetchone()
-
-        if result is None:
-            logging.error(f"Error: '{tv_show_name}' not found in the database")
-            return
+        with getCursor() as cursor:
+            query = "UPDATE tv_shows SET score=%s WHERE name=%s"
+            cursor.execute(query, (score, tv_show_name))
 
-        query = "UPDATE tv_shows SET score=%s WHERE name=%s"
-        myCursor.execute(query, (score, tv_show_name))
-        myDB.commit()
-        logging.info(f"Score '{score}' was set for '{tv_show_name}'")
+            if cursor.rowcount == 0:
+                logging.error(f"Error: '{tv_show_name}' not found in the database")
+                return False
+            logging.info(f"Score '{score}' was set for '{tv_show_name}'")
+        return True
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error updating the score: {error}")
+        return False
 
 def setDate(date, tv_show_name):
     """
@@ -90,24 +166,26 @@ def setDate(date, tv_show_name):
         date (str): The date when the show was last watched, in 'YYYY-MM-DD' format.
         tv_show_name (str): The name of the TV show.
 
+    Returns:
+        bool: 'True' if the date was set, 'False' otherwise.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the update query.
+        DatabaseError: If an error occurs while executing the update query.
     """
     try:
-        myCursor.execute("SELECT * FROM tv_shows WHERE name=%s", (tv_show_name,))
-        result = myCursor.fetchone()
+        with getCursor() as cursor:
+            query = "UPDATE tv_shows SET date=%s WHERE name=%s"
+            cursor.execute(query, (date, tv_show_name))
 
-        if result is None:
-            logging.info(f"Error: '{tv_show_name}' not found in the database")
-            return
-
-        query = "UPDATE tv_shows SET date=%s WHERE name=%s"
-        myCursor.execute(query, (date, tv_show_name))
-        myDB.commit()
-        logging.info(f"Date '{date}' set for '{tv_show_name}'")
+            if cursor.rowcount == 0:
+                logging.error(f"Error: '{tv_show_name}' not found in the database")
+                return False
+            logging.info(f"Date '{date}' set for '{tv_show_name}'")
+        return True
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error updating the date: {error}")
+        return False
 
 def deleteTVShow(tv_show_name):
     """
@@ -116,24 +194,26 @@ def deleteTVShow(tv_show_name):
     Args:
         tv_show_name (str): The name of the TV show to be removed.
 
+    Returns:
+        bool: 'True' if the TV show was deleted, 'False' otherwise.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the delete query.
+        DatabaseError: If an error occurs while executing the delete query.
     """
     try:
-        myCursor.execute("SELECT * FROM tv_shows WHERE name = %s", (tv_show_name,))
-        result = myCursor.fetchone()
-
-        if result is None:
-            logging.error(f"TV Show '{tv_show_name}' not found in the database")
-            return
+        with getCursor() as cursor:
+            query = "DELETE FROM tv_shows WHERE name = %s"
+            cursor.execute(query, (tv_show_name,))
 
-        query = "DELETE FROM tv_shows WHERE name = %s"
-        myCursor.execute(query, (tv_show_name,))
-        myDB.commit()
-        logging.info(f"TV Show '{tv_show_name}' deleted")
+            if cursor.rowcount == 0:
+                logging.error(f"TV Show '{tv_show_name}' not found in the database")
+                return False
+            logging.info(f"TV Show '{tv_show_name}' deleted")
+        return True
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error at deleting the TV show: {error}")
+        return False
 
 def snoozeATVShow(tv_show_name):
     """
@@ -142,29 +222,30 @@ def snoozeATVShow(tv_show_name):
     Args:
         tv_show_name (str): The name of the TV show to snooze.
 
+    Returns:
+        bool: 'True' if the TV show is snoozed (also if it already was), 'False' otherwise.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the insert query.
+        DatabaseError: If an error occurs while executing the insert query.
     """
     try:
-        query="SELECT id FROM tv_shows WHERE name = %s"
-        myCursor.execute(query, (tv_show_name,))
-        tv_show_id = myCursor.fetchone()
-
-        if tv_show_id:
-            tv_show_id = tv_show_id[0]
-
+        with getCursor() as cursor:
+            query = "INSERT INTO snoozed_tv_shows (tv_show_id) SELECT id FROM tv_shows WHERE name = %s"
             try:
-                secondQuery = "INSERT INTO snoozed_tv_shows (tv_show_id) VALUES (%s)"
-                myCursor.execute(secondQuery, (tv_show_id,))
-                myDB.commit()
-                logging.info(f"TV Show '{tv_show_name}' has been snoozed")
-            except mysql.connector.IntegrityError:
+                cursor.execute(query, (tv_show_name,))
+            except IntegrityError:
                 logging.warning(f"TV Show '{tv_show_name}' is already snoozed")
-        else:
-            logging.error(f"No TV Show found with the name '{tv_show_name}' in the database")
+                return True
+
+            if cursor.rowcount == 0:
+                logging.error(f"No TV Show found with the name '{tv_show_name}' in the database")
+                return False
+            logging.info(f"TV Show '{tv_show_name}' has been snoozed")
+        return True
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error at snoozing the TV Show: {error}")
+        return False
 
 
 def unsnoozeATVShow(tv_show_name):
@@ -174,134 +255,235 @@ def unsnoozeATVShow(tv_show_name):
     Args:
         tv_show_name (str): The name of the TV show to unsnooze.
 
+    Returns:
+        bool: 'True' if the TV show is not snoozed any more (also if it wasn't), 'False' otherwise.
+
     Exceptions:
-    mysql.connector.Error: If an error occurs while executing the delete query.
+    DatabaseError: If an error occurs while executing the delete query.
     """
     try:
-        query = "SELECT id FROM tv_shows WHERE name = %s"
-        myCursor.execute(query, (tv_show_name,))
-        tv_show_id = myCursor.fetchone()
-
-        if tv_show_id:
-            tv_show_id = tv_show_id[0]
+        with getCursor() as cursor:
+            query = "DELETE FROM snoozed_tv_shows WHERE tv_show_id IN (SELECT id FROM tv_shows WHERE name = %s)"
+            cursor.execute(query, (tv_show_name,))
 
-            test_query = "SELECT 'test' FROM snoozed_tv_shows WHERE tv_show_id = %s"
-            myCursor.execute(test_query, (tv_show_id,))
-            is_snoozed = myCursor.fetchone()
-
-            if is_snoozed:
-                secondQuery = "DELETE FROM snoozed_tv_shows WHERE tv_show_id = %s"
-                myCursor.execute(secondQuery, (tv_show_id,))
-                myDB.commit()
+            if cursor.rowcount:
                 logging.info(f"TV Show '{tv_show_name}' has been unsnoozed")
-            else:
+                return True
+
+            # Nothing was deleted: only now it matters whether the TV show exists.
+            cursor.execute("SELECT 1 FROM tv_shows WHERE name = %s", (tv_show_name,))
+            if cursor.fetchall():
                 logging.warning(f"TV Show '{tv_show_name}' isn't snoozed")
-        else:
+                return True
             logging.error(f"No TV Show found with the name '{tv_show_name}'")
+            return False
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error at unsnoozing the TV Show: {error}")
+        return False
 
-def listUnwatchedEpisodes():
+def getUnwatchedEpisodes(max_workers=MAX_WORKERS):
     """
-    This function lists the next episode (if exists) for all TV shows, excluding snoozed ones, ordered by rating.
+    This function finds the next episode (if exists) for all TV shows, excluding snoozed ones, ordered by rating.
+
+    The next episodes are requested concurrently, by at most 'max_workers' threads (the requests to each host are still rate limited).
+    The TVMaze ids (and statuses) that are not stored yet, as for the TV shows of an imported watchlist, are looked up and saved to
+    'tv_shows' once all the entries are yielded, so the next reports skip the lookup.
+    Each entry is yielded as soon as it and the entries of the TV shows with a higher score are available, so the order of the scores is kept.
+
+    Args:
+        max_workers (int): The maximum number of TV shows whose next episode is requested at the same time.
+
+    Yields:
+        dict: The 'name', 'last_episode', 'date', 'link' and 'score' of a TV show, and its 'next_episode' (a dictionary with
+        the 'title', 'season', 'episode' and 'remaining' episodes, or 'None' if there are no more episodes). When the next episode
+        couldn't be requested, 'next_episode' is 'None' and the entry also has an 'error'.
 
     Exceptions:
-    mysql.connector.Error: If an error occurs while executing the query.
+        DatabaseError: If an error occurs while executing the query.
     """
-    try:
+    with getCursor() as cursor:
         query = """
-            SELECT tv_shows.id, tv_shows.name, tv_shows.last_watched_episode, tv_shows.date, tv_shows.link, tv_shows.score
+            SELECT tv_shows.id, tv_shows.name, tv_shows.last_watched_episode, tv_shows.date, tv_shows.link, tv_shows.score,
+                   tv_shows.tvmaze_id, tv_shows.tvmaze_status
             FROM tv_shows
             WHERE tv_shows.id NOT IN (SELECT tv_show_id FROM snoozed_tv_shows)
             AND tv_shows.last_watched_episode IS NOT NULL
             ORDER BY tv_shows.score DESC;
         """
-        myCursor.execute(query)
-        results = myCursor.fetchall()
+        cursor.execute(query)
+        results = cursor.fetchall()
+
+    resolved_tv_shows = []
+
+    def findNextEpisode(row):
+        tv_show_id, link, tvmaze_id, tvmaze_status = row[0], row[4], row[6], row[7]
+        try:
+            if tvmaze_id is None or tvmaze_status is None:
+                tvmaze_show = getTVMazeShow(link.split("/")[-2])
+                if tvmaze_show:
+                    tvmaze_id = tvmaze_id or tvmaze_show['id']
+                    tvmaze_status = tvmaze_status or tvmaze_show['status']
+                    resolved_tv_shows.append((tvmaze_id, tvmaze_status, tv_show_id))
+            return getNextEpisode(link, row[2], tvmaze_id, tvmaze_status), None
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Request failed: {e}")
+            return None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        next_episodes = executor.map(findNextEpisode, results)
+
+        for row, (next_episode, error) in zip(results, next_episodes):
+            tv_show_id, name, last_episode, date, link, score, tvmaze_id, tvmaze_status = row
+            entry = {
+                'name': name,
+                'last_episode': last_episode,
+                'date': str(date) if date else None,
+                'link': link,
+                'score': score,
+                'next_episode': {key: next_episode[key] for key in ('title', 'season', 'episode', 'remaining')} if next_episode else None
+            }
+            if error is not None:
+                entry['error'] = error
+            yield entry
+
+    if resolved_tv_shows:
+        try:
+            with getCursor() as cursor:
+                cursor.executemany("UPDATE tv_shows SET tvmaze_id=%s, tvmaze_status=%s WHERE id=%s", resolved_tv_shows)
+        except DatabaseError as error:
+            logging.error(f"Error at saving the TVMaze ids: {error}")
+
+
+def logUnwatchedEpisode(entry):
+    """
+    This function logs the next episode of a TV show, as found by 'getUnwatchedEpisodes', as a single record.
+
+    The record also carries the 'show', 'season', 'episode', 'remaining' and 'score' fields, for the structured log.
+
+    Args:
+        entry (dict): The entry of the TV show.
+    """
+    next_episode = entry['next_episode']
+
+    lines = [
+        f"Name: {entry['name']}",
+        f"Last Episode Watched: {entry['last_episode']}",
+        f"Last Watched Date: {entry['date']}"
+    ]
+    if next_episode:
+        lines.append(f"Next Episode: {next_episode['title']} (S{next_episode['season']}E{next_episode['episode']})")
+        lines.append(f"Episodes Left: {next_episode['remaining']}")
+    elif entry.get('error'):
+        lines.append("-----  Couldn't fetch the next episode of this TV Show!  ------")
+    else:
+        lines.append("-----  There are no more episodes for this TV Show!  ------")
+    lines.append(f"IMDB Link: {entry['link']}")
+    lines.append(f"Score: {entry['score']}")
 
-        if results:
-            logging.info("New episodes for TV shows:\n")
-            for row in results:
-                tv_show_id, name, last_episode, date, link, score = row
+    logging.info("\n".join(lines), extra={
+        'show': entry['name'],
+        'season': next_episode['season'] if next_episode else None,
+        'episode': next_episode['episode'] if next_episode else None,
+        'remaining': next_episode['remaining'] if next_episode else 0,
+        'score': entry['score']
+    })
 
-                next_episode = getNextEpisode(link, last_episode)
 
-                if next_episode:
-                    next_episode_title = next_episode['title']
-                    next_episode_season = next_episode['season']
-                    next_episode_episode_number = next_episode['episode']
-                else:
-                    next_episode_title = " There are no more episodes for this TV Show! "
-                    next_episode_season = next_episode_episode_number = None
+def listUnwatchedEpisodes(max_workers=MAX_WORKERS):
+    """
+    This function lists the next episode (if exists) for all TV shows, excluding snoozed ones, ordered by rating.
 
+    The entries are logged as they become available (see 'getUnwatchedEpisodes').
 
-                logging.info(f"Name: {name}")
-                logging.info(f"Last Episode Watched: {last_episode}")
-                logging.info(f"Last Watched Date: {date}")
-                if next_episode_season is not None and next_episode_episode_number is not None:
-                    logging.info(f"Next Episode: {next_episode_title} (S{next_episode_season}E{next_episode_episode_number})")
-                else:
-                    logging.info(f"----- {next_episode_title} ------")
-                logging.info(f"IMDB Link: {link}")
-                logging.info(f"Score: {score}")
-                logging.info("-." * 30)
-        else:
+    Args:
+        max_workers (int): The maximum number of TV shows whose next episode is requested at the same time.
+
+    Returns:
+        list: The entries that were logged (empty if there are none or an error occurs).
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the query.
+    """
+    entries = []
+    started = time.perf_counter()
+    try:
+        for entry in getUnwatchedEpisodes(max_workers):
+            if not entries:
+                logging.info("New episodes for TV shows:\n")
+            logUnwatchedEpisode(entry)
+            entries.append(entry)
+
+        if not entries:
             logging.info("No new episodes available")
+        duration = time.perf_counter() - started
+        logging.info(f"Listed the next episodes of {len(entries)} TV shows in {duration:.2f}s", extra={'shows': len(entries), 'duration': duration})
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error at listing new episodes: {error}")
 
+    return entries
+
+
+def refreshEpisodeIndexes():
+    """
+    This function refreshes the cached TVMaze episode lists of the TV shows that are not snoozed, so the next episode report finds them up to date.
+
+    Only the episode lists whose cached copy has expired are requested again (with a conditional request).
+
+    Returns:
+        bool: False if the TV shows couldn't be read from the database, True otherwise.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the query.
+    """
+    try:
+        with getCursor() as cursor:
+            cursor.execute("SELECT tvmaze_id, tvmaze_status FROM tv_shows "
+                           "WHERE tvmaze_id IS NOT NULL AND id NOT IN (SELECT tv_show_id FROM snoozed_tv_shows)")
+            tvmaze_shows = cursor.fetchall()
+    except DatabaseError as error:
+        logging.error(f"Error at refreshing the episode lists: {error}")
+        return False
+
+    for tvmaze_id, tvmaze_status in tvmaze_shows:
+        try:
+            getEpisodeIndex(tvmaze_id, getEpisodesTTL(tvmaze_status))
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Request failed: {e}")
+    logging.info(f"Episode lists refreshed for {len(tvmaze_shows)} TV shows")
+    return True
+
 
 def getEarliestTVShowDate():
     """
     This function retrieves the release date of the earliest TV show in the database.
 
-    This function gathers all TV show links from the database, retrieves the IMDb ID, and uses the OMDb API to fetch the release date.
-    The function then returns the earliest release date in 'YYYY-MM-DD' format.
+    The release dates are stored in the 'tv_shows' table when the shows are added, so a single query is enough.
     If no TV shows are found or there's an error, it returns a default date of "2000-01-01".
 
     Returns:
         str: The earliest release date of TV shows in the database in 'YYYY-MM-DD' format, or "2000-01-01" if no data is available or an error occurs.
 
     Exceptions:
-        mysql.connector.Error: If an error occurs while fetching data from the database.
-        requests.exceptions.RequestException: If an error occurs during the request to the OMDb API.
+        DatabaseError: If an error occurs while fetching data from the database.
     """
     try:
-        myCursor.execute("SELECT link FROM tv_shows")
-        results = myCursor.fetchall()
-
-        if not results:
-            logging.warning("No TV shows found in the database.")
-            return "2000-01-01"
+        with getCursor() as cursor:
+            cursor.execute("SELECT MIN(release_date), COUNT(*) - COUNT(release_date) FROM tv_shows")
+            earliest_date, missing_dates = cursor.fetchone()
 
-        release_dates = []
+            if missing_dates:
+                logging.warning(f"{missing_dates} TV shows have no release date, use the 'backfill' command to fetch it")
 
-        for (link,) in results:
-            imdb_id = link.split("/")[-2]
-            url = f"https://www.omdbapi.com/?i={imdb_id}&apikey={API_KEY}"
+            if earliest_date is None:
+                logging.warning("No release dates found in the database.")
+                return "2000-01-01"
 
-            try:
-                response = requests.get(url)
-                data = response.json()
-
-                if data.get("Response") == "True":
-                    release_date = data.get("Released", "2000-01-01")
-                    release_date = datetime.strptime(release_date, "%d %b %Y").strftime("%Y-%m-%d")
-                    release_dates.append(release_date)
-                else:
-                    logging.error(f"Error fetching data for {link}: {data.get('Error')}")
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Request error for {link}: {e}")
+            return str(earliest_date)
 
-        if release_dates:
-            return min(release_dates)
-        else:
-            return "2000-01-01"
-
-    except mysql.connector.Error as error:
-        logging.error(f"Error retrieving show links: {error}")
+    except DatabaseError as error:
+        logging.error(f"Error retrieving the earliest release date: {error}")
         return "2000-01-01"
 
 
@@ -316,17 +498,44 @@ def getAverageScore():
         float: The average score of all TV shows, or 5 if no score exists, or 0 if an error occurs.
 
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the query.
+        DatabaseError: If an error occurs while executing the query.
     """
     try:
-        myCursor.execute("SELECT AVG(score) FROM tv_shows")
-        result = myCursor.fetchone()
-        return result[0] if result[0] else 5
-    except mysql.connector.Error as error:
+        with getCursor() as cursor:
+            cursor.execute("SELECT AVG(score) FROM tv_shows")
+            result = cursor.fetchone()
+            return result[0] if result[0] else 5
+    except DatabaseError as error:
         logging.error(f"Error calculating average score: {error}")
         return 0
 
 
+def getNewTVShows():
+    """
+    This function finds new TV shows for the user based on the earliest release date and average score of the TV shows in the database.
+
+    Returns:
+        tuple: The earliest release date, the average score and the list of recommended TV shows ('None' if the search failed,
+        see 'fetchNewShowsFromIMDB').
+    """
+    latest_date = getEarliestTVShowDate()
+    average_score = getAverageScore()
+    new_shows = fetchNewShowsFromIMDB(latest_date, average_score)
+    return latest_date, average_score, new_shows
+
+
+def logRecommendedTVShow(show):
+    """
+    This function logs a recommended TV show.
+
+    Args:
+        show (dict): The title, score, release date and link of the TV show.
+    """
+    logging.info(
+        f"- {show['title']} (Score: {show['score']:.1f}, Release Date: {show['release_date']}, Link: {show['link']})",
+        extra={'show': show['title'], 'score': show['score']})
+
+
 def showNewTVShows():
     """
     This function displays new TV shows for the user based on the earliest release date and average score.
@@ -338,22 +547,28 @@ def showNewTVShows():
         - Earliest release date from the database.
         - Average score from the database.
         - Recommended TV shows with their title, score, release date, and link.
+
+    Returns:
+        list: The recommended TV shows, or 'None' if they couldn't be fetched.
     """
-    latest_date = getEarliestTVShowDate()
-    average_score = getAverageScore()
-    new_shows = fetchNewShowsFromIMDB(latest_date, average_score)
+    latest_date, average_score, new_shows = getNewTVShows()
 
     logging.info(f"Earliest TV Show release date in the database: {latest_date}")
     logging.info(f"Average score in the database: {average_score:.2f}")
 
+    if new_shows is None:
+        logging.error("Couldn't fetch the recommended TV shows")
+        return None
+
     logging.info("TV Shows recommended:")
     if new_shows:
         for show in new_shows:
-            logging.info(
-                f"- {show['title']} (Score: {show['score']:.1f}, Release Date: {show['release_date']}, Link: {show['link']})")
+            logRecommendedTVShow(show)
     else:
         logging.info("Couldn't find TV Shows!")
 
+    return new_shows
+
 
 def addVideos(tv_show_id, season, episode, videos, tv_show_name, type_of_search):
     """
@@ -370,33 +585,38 @@ def addVideos(tv_show_id, season, episode, videos, tv_show_name, type_of_search)
         tv_show_name (str): The name of the TV show.
         type_of_search (str): The type of search ('notification' or 'trailer').
 
+    Returns:
+        bool: 'True' if the videos were saved, 'False' if a database error occurred.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the insert query.
+        DatabaseError: If an error occurs while executing the insert query.
     """
     try:
-        query = """
-                INSERT INTO youtube_videos (tv_show_id, season, episode, url, type)
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE url = VALUES(url), type = VALUES(type);
-            """
-        myCursor.executemany(query, [
-            (tv_show_id, season, episode, video["url"], type_of_search) for video in videos
-        ])
-        myDB.commit()
-
-        if type_of_search == 'notification':
-            logging.info(f"Saved new videos for '{tv_show_name}', Season {season}, Episode {episode}")
-        else:
-            logging.info(f"Saved new videos for '{tv_show_name}', Season {season}, Episode {episode}")
+        with getCursor() as cursor:
+            query = storage.upsertQuery("youtube_videos", ["tv_show_id", "season", "episode", "url", "type"], ["url"], ["url", "type"])
+            cursor.executemany(query, [
+                (tv_show_id, season, episode, video["url"], type_of_search) for video in videos
+            ])
+
+            if type_of_search == 'notification':
+                logging.info(f"Saved new videos for '{tv_show_name}', Season {season}, Episode {episode}")
+            else:
+                logging.info(f"Saved new videos for '{tv_show_name}', Season {season}, Episode {episode}")
+        return True
 
-    except mysql.connector.Error as error:
+    except DatabaseError as error:
         logging.error(f"Error saving videos to database: {error}")
+        return False
 
 
 def listNewVideos(tv_show_name, season, episode, type_of_search):
     """
     This function searches for videos (that were not requested before) related to a TV show, season, and episode.
 
+    Once the videos are saved, the watermark of the episode is moved to the newest video found (see 'notifyForNewVideos'), so the next
+    poll cycles don't search again for the videos it already saw. It is left where it was while some relevant videos aren't saved yet.
+    The query variants are sent in parallel, so every call costs 3 x 'YOUTUBE_SEARCH_COST' quota units (see 'searchTrailers');
+    the variants the quota left for the day can't pay for are skipped.
     If videos are found, they are logged, and then added to the database.
     If no videos are found, it logs that no videos were found.
 
@@ -405,122 +625,315 @@ def listNewVideos(tv_show_name, season, episode, type_of_search):
         season (int): The season number.
         episode (int): The episode number.
         type_of_search (str): The type of search ('notification' or 'trailer').
+
+    Returns:
+        bool: 'True' if the search ran and the videos found were saved, 'False' otherwise.
     """
     try:
-        query = "SELECT id FROM tv_shows WHERE name = %s"
-        myCursor.execute(query, (tv_show_name,))
-        tv_show_id = myCursor.fetchone()
+        with getCursor() as cursor:
+            query = "SELECT id FROM tv_shows WHERE name = %s"
+            cursor.execute(query, (tv_show_name,))
+            tv_show_id = cursor.fetchone()
 
         if not tv_show_id:
             logging.error(f"TV Show '{tv_show_name}' not found")
-            return
+            return False
 
         tv_show_id = tv_show_id[0]
 
-        videos = searchTrailers(tv_show_name, season, episode, 'trailer')
+        videos, newest_found = searchTrailers(tv_show_name, season, episode, 'trailer')
+        newest_published_at = max([published for published in [parsePublishedAt(newest_found), getVideoWatermark(tv_show_id, season, episode)]
+                                   if published], default=None)
 
         if videos:
             logging.info("New videos found:")
             for video in videos:
                 logging.info(f"- {video['title']} ({video['publishedAt']})\n  {video['url']}")
-
-            addVideos(tv_show_id, season, episode, videos, tv_show_name, type_of_search)
         else:
             logging.info("No videos found for this episode")
+
+        # The watermark only moves past the videos once they are saved, so a failed insert doesn't hide them from the next searches.
+        with transaction():
+            if videos and not addVideos(tv_show_id, season, episode, videos, tv_show_name, type_of_search):
+                return False
+            updateVideoWatermark(tv_show_id, season, episode, newest_published_at)
+        return True
     except Exception as error:
         logging.error(f"Error in listNewVideos: {str(error)}")
+        return False
+
+def parsePublishedAt(published_at):
+    """
+    Converts the 'publishedAt' field of a YouTube video (RFC 3339, e.g. "2024-05-01T10:00:00Z") into a naive UTC datetime.
+
+    Args:
+        published_at (str): The publishing time returned by the YouTube Data API.
+
+    Returns:
+        datetime: The publishing time in UTC, or 'None' if it can't be parsed.
+    """
+    try:
+        return datetime.fromisoformat(published_at.replace("Z", "+00:00")).astimezone(timezone.utc).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def getVideoWatermark(tv_show_id, season, episode):
+    """
+    This function returns the publishing time of the newest video seen for an episode.
+
+    Args:
+        tv_show_id (int): The ID of the TV show.
+        season (int): The season number.
+        episode (int): The episode number.
+
+    Returns:
+        datetime: The publishing time (UTC) of the newest video seen, or 'None' if the episode has no watermark or an error occurs.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the query.
+    """
+    try:
+        with getCursor() as cursor:
+            cursor.execute("SELECT newest_published_at FROM video_watermarks WHERE tv_show_id = %s AND season = %s AND episode = %s",
+                           (tv_show_id, season, episode))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    except DatabaseError as error:
+        logging.error(f"Error reading the video watermark: {error}")
+        return None
+
+
+def updateVideoWatermark(tv_show_id, season, episode, newest_published_at):
+    """
+    This function records that an episode was polled now, together with the publishing time of the newest video known for it.
+
+    Args:
+        tv_show_id (int): The ID of the TV show.
+        season (int): The season number.
+        episode (int): The episode number.
+        newest_published_at (datetime): The publishing time (UTC) of the newest video found for the episode, or 'None'.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the query.
+    """
+    try:
+        with getCursor() as cursor:
+            query = storage.upsertQuery("video_watermarks", ["tv_show_id", "season", "episode", "newest_published_at", "last_polled_at"],
+                                        ["tv_show_id", "season", "episode"], ["newest_published_at", "last_polled_at"])
+            last_polled_at = datetime.now(timezone.utc).replace(tzinfo=None)
+            cursor.execute(query, (tv_show_id, season, episode, newest_published_at, last_polled_at))
+    except DatabaseError as error:
+        logging.error(f"Error updating the video watermark: {error}")
+
 
-def notifyForNewVideos(type_of_search):
+def notifyForNewVideos(type_of_search, interval=NOTIFY_INTERVAL):
     """
     This function notifies the user when new videos are found for TV shows with existing videos in the database.
 
-    If new videos are found, they are added to the database, and a notification is logged.
+    Every YouTube search costs quota units, so each call (poll cycle) gets a share of the quota left for the day.
+    The episodes are checked in order of priority (the score of the TV show, how recently the episode aired, how long ago it was last checked
+    and how long ago its newest video was published) until the budget of the cycle is spent; the rest are deferred to the next cycles.
+    Each episode keeps a watermark with the publishing time of the newest video seen, and the searches only ask for videos uploaded after it.
+    If new videos are found, a notification is logged. The watermarks and the new videos of the cycle are written to the database
+    together at the end of the cycle, in a single transaction.
     If no new videos are found, a message indicating that no new videos were found is logged.
 
     Args:
         type_of_search (str): The type of search ('notification').
+        interval (int): The number of seconds between two poll cycles, used to split the daily quota.
+
+    Returns:
+        bool: False if the poll cycle failed, True otherwise.
     """
     try:
-        query = """
-            SELECT DISTINCT tv_shows.id, tv_shows.name, youtube_videos.season, youtube_videos.episode
-            FROM tv_shows
-            JOIN youtube_videos ON tv_shows.id = youtube_videos.tv_show_id
-        """
-        myCursor.execute(query)
-        tv_shows = myCursor.fetchall()
+        with getCursor() as cursor:
+            query = """
+                SELECT tv_shows.id, tv_shows.name, tv_shows.score, tv_shows.tvmaze_id, tv_shows.tvmaze_status, episodes.season, episodes.episode,
+                       video_watermarks.newest_published_at, video_watermarks.last_polled_at
+                FROM (SELECT DISTINCT tv_show_id, season, episode FROM youtube_videos) AS episodes
+                JOIN tv_shows ON tv_shows.id = episodes.tv_show_id
+                LEFT JOIN video_watermarks ON video_watermarks.tv_show_id = episodes.tv_show_id
+                    AND video_watermarks.season = episodes.season AND video_watermarks.episode = episodes.episode
+            """
+            cursor.execute(query)
+            tv_shows = cursor.fetchall()
 
         if not tv_shows:
             logging.info("No TV shows found with existing videos in youtube_videos.")
-            return
+            return True
+
+        def getPriority(row):
+            last_polled_at = row[8].replace(tzinfo=timezone.utc).timestamp() if row[8] else None
+            return getCheckPriority(row[2], getEpisodeAirDate(row[3], row[5], row[6], row[4]), last_polled_at, now, row[7])
+
+        budget = youtubeQuota.cycleBudget(interval)
+        now = time.time()
+        results = []
+        tv_shows.sort(key=getPriority, reverse=True)
+
+        try:
+            for position, tv_show in enumerate(tv_shows):
+                tv_show_id, tv_show_name, score, tvmaze_id, tvmaze_status, season, episode, newest_published_at, last_polled_at = tv_show
+
+                if budget.units < YOUTUBE_SEARCH_COST:
+                    logging.info(f"Quota budget of this cycle used, {len(tv_shows) - position} episodes deferred to the next cycles")
+                    break
+
+                published_after = None
+                if newest_published_at:
+                    published_after = (newest_published_at + timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                videos, newest_found = searchTrailers(tv_show_name, season, episode, budget=budget, publishedAfter=published_after)
+                # The videos already in the database count too, so an episode whose results are all known still gets a watermark;
+                # 'None' (some relevant videos were left out) keeps the watermark where it was.
+                newest_published_at = max([published for published in [parsePublishedAt(newest_found), newest_published_at] if published], default=None)
+                results.append((tv_show_id, tv_show_name, season, episode, newest_published_at, videos))
+
+                if videos:
+                    logging.info(f"New videos found for {tv_show_name} (S{season}E{episode})!",
+                                 extra={'show': tv_show_name, 'season': season, 'episode': episode, 'videos': len(videos)})
+                else:
+                    logging.info(f"No videos found for {tv_show_name}")
+        finally:
+            # The watermarks and the videos of the whole cycle are written in one transaction, also when the cycle stops early.
+            if results:
+                with transaction():
+                    for tv_show_id, tv_show_name, season, episode, newest_published_at, videos in results:
+                        if not videos or addVideos(tv_show_id, season, episode, videos, tv_show_name, type_of_search):
+                            updateVideoWatermark(tv_show_id, season, episode, newest_published_at)
+        return True
+    except Exception as error:
+        logging.error(f"Error in notifyForNewVideos (search for existing TV shows in youtube_videos): {str(error)}")
+        return False
 
-        for tv_show in tv_shows:
-            tv_show_id, tv_show_name, season, episode = tv_show
 
-            videos = searchTrailers(tv_show_name, season, episode)
+def getNotifications(page_size=NOTIFICATION_PAGE_SIZE, tv_show_name=None, after_id=0):
+    """
+    This function yields the new videos (of type 'notification') of the TV shows that are not snoozed, oldest first.
 
-            if videos:
-                logging.info(f"New videos found for {tv_show_name} (S{season}E{episode})!")
-                addVideos(tv_show_id, season, episode, videos, tv_show_name, type_of_search)
-            else:
-                logging.info(f"No videos found for {tv_show_name}")
-    except Exception as error:
-        logging.error(f"Error in notifyForNewVideos (search for existing TV shows in youtube_videos): {str(error)}")
+    The videos are read one page at a time, continuing after the id of the last video of the previous page (keyset pagination),
+    so every page is an index lookup and only one page is kept in memory, however many notifications piled up.
+    No connection is held between two pages.
+
+    Args:
+        page_size (int): The number of videos read with each query.
+        tv_show_name (str): Only the videos of this TV show are yielded, if given.
+        after_id (int): Only the videos with a higher id are yielded.
 
+    Yields:
+        dict: The 'id', 'name' (of the TV show), 'season', 'episode' and 'url' of a video.
 
-def markVideosAsSeen():
+    Exceptions:
+        DatabaseError: If an error occurs while executing the query.
+    """
+    query = """
+        SELECT youtube_videos.id, tv_shows.name, youtube_videos.season, youtube_videos.episode, youtube_videos.url
+        FROM youtube_videos
+        JOIN tv_shows ON youtube_videos.tv_show_id = tv_shows.id
+        WHERE youtube_videos.type = 'notification'
+        AND youtube_videos.id > %s
+        AND NOT EXISTS (SELECT 1 FROM snoozed_tv_shows WHERE snoozed_tv_shows.tv_show_id = youtube_videos.tv_show_id)
+    """
+    if tv_show_name is not None:
+        query += " AND tv_shows.name = %s"
+    query += " ORDER BY youtube_videos.id LIMIT %s"
+
+    while True:
+        parameters = (after_id, tv_show_name, page_size) if tv_show_name is not None else (after_id, page_size)
+        with getCursor() as cursor:
+            cursor.execute(query, parameters)
+            rows = cursor.fetchall()
+
+        for video_id, name, season, episode, url in rows:
+            yield {'id': video_id, 'name': name, 'season': season, 'episode': episode, 'url': url}
+
+        if len(rows) < page_size:
+            return
+        after_id = rows[-1][0]
+
+
+def markVideosAsSeen(up_to_id, tv_show_name=None):
     """
-    This function marks all videos of type 'notification' as 'seen' in the database when the user requests to see the notifications.
+    This function marks the videos listed by 'see_notifications' as 'seen' in the database.
 
+    Only the notifications that could have been listed are marked: the ones up to the last id listed, of TV shows that are not snoozed
+    (and of the requested TV show, if any). The notifications of snoozed TV shows stay pending until the TV shows are unsnoozed.
     A confirmation message is logged after the update is complete.
 
+    Args:
+        up_to_id (int): The id of the last video listed.
+        tv_show_name (str): The TV show the list was filtered by, if any.
+
+    Returns:
+        bool: 'True' if the videos were marked, 'False' otherwise.
+
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the query.
+        DatabaseError: If an error occurs while executing the query.
     """
     try:
-        query = """
-            UPDATE youtube_videos
-            SET type = 'seen'
-            WHERE type = 'notification'
-        """
-        myCursor.execute(query, )
-        myDB.commit()
-        logging.info(f"You're up to date with the videos!")
-    except mysql.connector.Error as error:
+        with getCursor() as cursor:
+            query = """
+                UPDATE youtube_videos
+                SET type = 'seen'
+                WHERE type = 'notification'
+                AND id <= %s
+                AND NOT EXISTS (SELECT 1 FROM snoozed_tv_shows WHERE snoozed_tv_shows.tv_show_id = youtube_videos.tv_show_id)
+            """
+            parameters = (up_to_id,)
+            if tv_show_name is not None:
+                query += " AND tv_show_id IN (SELECT id FROM tv_shows WHERE name = %s)"
+                parameters += (tv_show_name,)
+            cursor.execute(query, parameters)
+            logging.info(f"You're up to date with the videos!")
+        return True
+    except DatabaseError as error:
         logging.error(f"Error marking videos as seen: {error}")
+        return False
 
 
-def see_notifications():
+def see_notifications(page_size=NOTIFICATION_PAGE_SIZE, tv_show_name=None):
     """
-    This function retrieves and displays the TV Shows that were found to have new video uploads.
+    This function displays the new videos of the TV shows that are not snoozed, one page at a time.
+
+    Each page of 'page_size' videos is logged as soon as it is read (see 'getNotifications'), with the names, seasons, episodes, and URLs
+    of the videos. If no new videos are available, a message indicating that is logged.
 
-    This function queries the database for TV shows with new videos marked as 'notification', excluding shows in the 'snoozed_tv_shows' list.
-    It returns a message containing the names, seasons, episodes, and URLs of the new videos.
-    If no new videos are available, a message indicating that is returned.
+    Args:
+        page_size (int): The number of videos in every page.
+        tv_show_name (str): Only the videos of this TV show are displayed, if given.
 
     Returns:
-        str: A message listing new videos or indicating no new videos are available.
+        int: The id of the last video displayed, or 'None' if there were no new videos or an error occurred.
 
     Exception:
-        mysql.connector.Error: If an error occurs while executing the query.
+        DatabaseError: If an error occurs while executing the query.
     """
+    last_id = None
+    page = []
+    page_number = 0
+
+    def logPage():
+        logging.info(f"New videos to watch (page {page_number}):\n" + "\n".join(
+            f"TV Show: {video['name']} - S{video['season']}E{video['episode']} - {video['url']}" for video in page))
+
     try:
-        query = """
-            SELECT tv_shows.name, youtube_videos.season, youtube_videos.episode, youtube_videos.url
-            FROM youtube_videos
-            JOIN tv_shows ON youtube_videos.tv_show_id = tv_shows.id
-            WHERE youtube_videos.type = 'notification'
-            AND tv_shows.id NOT IN (SELECT tv_show_id FROM snoozed_tv_shows)
-        """
-        myCursor.execute(query)
-        results = myCursor.fetchall()
-
-        if results:
-            message = "New videos to watch:"
-            for row in results:
-                show_name, season, episode, url = row
-                message += f"\nTV Show: {show_name} - S{season}E{episode} - {url}"
-            return message
-        else:
-            return "No new videos available!"
-    except mysql.connector.Error as error:
-        return f"Error retrieving notifications: {error}"
\ No newline at end of file
+        for video in getNotifications(page_size, tv_show_name):
+            page.append(video)
+            last_id = video['id']
+            if len(page) == page_size:
+                page_number += 1
+                logPage()
+                page = []
+
+        if page:
+            page_number += 1
+            logPage()
+        if last_id is None:
+            logging.info("No new videos available!")
+
+    except DatabaseError as error:
+        logging.error(f"Error retrieving notifications: {error}")
+        return None
+
+    return last_id
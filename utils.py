@@ -1,5 +1,9 @@
 import re
+import threading
+import time
 from datetime import datetime
+from urllib.parse import urlparse
+from config import HOST_RATE_LIMITS
 
 def verifyEpisodeFormat(episode):
     """
@@ -28,4 +32,46 @@ def verifyDateFormat(date):
         datetime.strptime(date, "%Y-%m-%d")
         return True
     except ValueError:
-        return False
\ No newline at end of file
+        return False
+
+
+class HostRateLimiter:
+    """
+    Limits the rate of the requests sent to each host, using a token bucket per host.
+
+    Every host from 'limits' gets a bucket that is refilled with 'rate' tokens per second and holds at most 'burst' tokens.
+    Each request takes one token, and the threads that find the bucket empty wait until a token is available.
+    Hosts that are not in 'limits' are not limited.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.buckets = {host: [float(burst), time.monotonic()] for host, (rate, burst) in limits.items()}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        """
+        Blocks until a request to the host of 'url' is allowed.
+
+        Args:
+            url (str): The URL that is about to be requested.
+        """
+        host = urlparse(url).hostname
+        if host not in self.limits:
+            return
+
+        rate, burst = self.limits[host]
+        while True:
+            with self.lock:
+                bucket = self.buckets[host]
+                now = time.monotonic()
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return
+                delay = (1 - bucket[0]) / rate
+            time.sleep(delay)
+
+
+hostRateLimiter = HostRateLimiter(HOST_RATE_LIMITS)
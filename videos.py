@@ -1,59 +1,124 @@
-from googleapiclient.discovery import build
-import re
-from config import YOUTUBE_API_KEY
-from dbConnector import myCursor, myDB
-import mysql.connector
-import random
+from matcher import TrailerMatcher
+from youtubeClient import getYoutubeClient
+from quota import youtubeQuota, QuotaBudget
+from metrics import metrics
+from config import YOUTUBE_SEARCH_COST
+from dbConnector import getCursor, DatabaseError
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+searchExecutor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="youtube-search")
 
-def searchTrailers(tvShowName, season, episode, typeOfSearch='notification'):
+
+def runSearch(queryString, order_by, publishedAfter=None):
+    """
+    Sends one search request to the YouTube Data API, using the client of the calling thread.
+
+    The quota units of the call are recorded in the daily quota tracker, and its duration in the metrics.
+
+    Args:
+        queryString (str): The search query.
+        order_by (str): The order of the results ('viewCount' or 'relevance').
+        publishedAfter (str): Only videos published at or after this RFC 3339 time are returned, if given.
+
+    Returns:
+        dict: The decoded response of the 'search.list' call.
+    """
+    parameters = {
+        "q": queryString,
+        "part": "snippet,id",
+        "type": "video",
+        "videoDuration": "short",
+        "maxResults": 10,
+        "relevanceLanguage": "en",
+        "order": order_by
+    }
+    if publishedAfter:
+        parameters["publishedAfter"] = publishedAfter
+
+    request = getYoutubeClient().search().list(**parameters)
+    youtubeQuota.spend(YOUTUBE_SEARCH_COST)
+    with metrics.timed("youtube", "search.list"):
+        return request.execute()
+
+
+def searchTrailers(tvShowName, season, episode, typeOfSearch='notification', parallel=None, budget=None, publishedAfter=None):
     """
     Searches YouTube for trailers related to a specific TV show, season, and episode.
 
     This function creates several search queries based on the TV show's name, season, and episode, and uses the YouTube Data API to retrieve relevant video details.
     It returns a list of YouTube video information about the trailers or notifications for the requested TV show.
 
+    The query variants are always tried in the same order, so the same answers from YouTube give the same results.
+    In parallel mode all the variants are sent at once and their results are merged in that order as they arrive, so a parallel
+    search always costs one search per variant (3 x 'YOUTUBE_SEARCH_COST' units), even when the first variant finds enough videos.
+    In sequential mode a variant is only sent if the previous ones didn't find enough videos, which spends less quota.
+    A variant is only sent if the quota budget can still pay for it; without a budget, the quota left for the day is the budget.
+
     Args:
         tvShowName (str): The name of the TV show.
         season (int): The season number of the TV show.
         episode (int): The episode number of the TV show.
         typeOfSearch (str): The type of search to perform, either 'notification' or 'trailer'.
+        parallel (bool): Whether to send the query variants concurrently. By default, only 'trailer' searches (requested by the user) are parallel.
+        budget (QuotaBudget): The quota budget the searches are paid from, or 'None' for the quota left for the day.
+        publishedAfter (str): Only ask for videos published at or after this RFC 3339 time (the watermark of the episode), if given.
 
     Returns:
-        list: A list of dictionaries containing details about the YouTube videos.
+        tuple: A list of dictionaries containing details about the new YouTube videos (at most 2, not already in the database), and the
+        newest 'publishedAt' of all the relevant videos found, including the ones already in the database, which is the next watermark
+        of the episode. It is 'None' if no relevant video was found, or if some relevant videos may have been left out (the limit of
+        2 videos was reached, or the quota couldn't pay for every variant): moving the watermark past them would lose them for good,
+        while the next search finds them again and skips the ones now in the database.
 
     Exceptions:
         Exception: If there is any error while querying the YouTube Data API or processing the response.
     """
-
-    youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-
     queryStrings = [f'"{tvShowName}" "s{season:02d}e{episode:02d}"',
                     f'"{tvShowName}" "season {season}" "episode {episode}"',
                     f'"{tvShowName}" "{season}x{episode:02d}"']
 
+    if parallel is None:
+        parallel = typeOfSearch == 'trailer'
+
     seenVideoIds = set()
-    random.shuffle(queryStrings)
 
     order_by = "viewCount" if typeOfSearch == 'trailer' else "relevance"
 
     results=[]
+    newestPublishedAt = None
+    complete = True
+    knownUrls = getKnownVideoUrls(tvShowName, season, episode)
+    matcher = TrailerMatcher(tvShowName, season, episode)
+
+    if budget is None:
+        budget = QuotaBudget(youtubeQuota.remaining())
+
+    quotaWarnings = []
+
+    def isAffordable():
+        if budget.take(YOUTUBE_SEARCH_COST):
+            return True
+        if not quotaWarnings:
+            quotaWarnings.append(True)
+            logging.warning(f"Not enough YouTube quota left to search for {tvShowName} (S{season}E{episode})")
+        return False
+
+    if parallel:
+        futures = [searchExecutor.submit(runSearch, queryString, order_by, publishedAfter) for queryString in queryStrings if isAffordable()]
+        responses = (future.result() for future in futures)
+    else:
+        futures = []
+        responses = (runSearch(queryString, order_by, publishedAfter) for queryString in queryStrings if isAffordable())
 
     try:
-        for queryString in queryStrings:
-            request = youtube.search().list(
-                q=queryString,
-                part="snippet,id",
-                type="video",
-                videoDuration="short",
-                maxResults=10,
-                relevanceLanguage="en",
-                order=order_by
-            )
-            response = request.execute()
-
-            for videoItem in response.get('items', []):
+        for response in responses:
+            relevantItems = matcher.classify(response.get('items', []))
+            # RFC 3339 times in UTC ('Z'), as YouTube returns them, are ordered like their strings.
+            newestPublishedAt = max([published for published in [newestPublishedAt] + [item['snippet'].get('publishedAt') for item in relevantItems]
+                                     if published], default=None)
+
+            for videoItem in relevantItems:
                 videoId = videoItem['id']['videoId']
 
                 if videoId in seenVideoIds:
@@ -62,9 +127,6 @@ def searchTrailers(tvShowName, season, episode, typeOfSearch='notification'):
                 videoTitle = videoItem['snippet']['title']
                 videoDescription = videoItem['snippet'].get('description', '').lower()
 
-                if checkWrongShowOrSeason(videoTitle, videoDescription, tvShowName, season, episode):
-                    continue
-
                 videoData = {
                     "title": videoTitle,
                     "url": f"https://www.youtube.com/watch?v={videoId}",
@@ -73,7 +135,7 @@ def searchTrailers(tvShowName, season, episode, typeOfSearch='notification'):
                     "description": videoDescription[:200] + "..." if len(videoDescription) > 200 else videoDescription
                 }
 
-                if not isVideoInDatabase(tvShowName, season, episode, videoData["url"]):
+                if videoData["url"] not in knownUrls:
                     results.append(videoData)
                     seenVideoIds.add(videoId)
 
@@ -81,106 +143,50 @@ def searchTrailers(tvShowName, season, episode, typeOfSearch='notification'):
                     break
 
             if len(results) >= 2:
+                complete = False
                 break
 
-        return results[:2]
+        if quotaWarnings:
+            complete = False
+        return results[:2], newestPublishedAt if complete else None
 
     except Exception as error:
         logging.error(f"Error searching YouTube: {str(error)}")
-        return []
-
-
-def checkWrongShowOrSeason(videoTitle, videoDescription, showName, targetSeason, targetEpisode):
-    """
-    Validates if the video matches the correct TV show, season, and episode.
-
-    This function checks the video title and description for patterns related to the show, season, and episode to confirm that the video matches the requested criteria.
-
-    Args:
-        videoTitle (str): The title of the YouTube video.
-        videoDescription (str): The description of the YouTube video.
-        showName (str): The name of the TV show.
-        targetSeason (int): The season number of the TV show.
-        targetEpisode (int): The episode number of the TV show.
-
-    Returns:
-        bool: True if the video is not relevant to the requested TV show, season, and episode, False otherwise.
-    """
-    titleLower = videoTitle.lower()
-    descriptionLower = videoDescription.lower()
-    showNameLower = showName.lower()
-
-    if showNameLower not in titleLower:
-        return True
-
-    seasonPatterns = [r"season (\d+)", r"s(\d+)", r"(\d+)x", r"episode (\d+)", r"ep(\d+)"]
-
-    foundSeason = None
-    foundEpisode = None
-
-    for seasonPattern in seasonPatterns:
-        matches = re.findall(seasonPattern, titleLower)
-        for match in matches:
-            if isinstance(match, tuple):
-                foundSeason = int(match[0])
-                foundEpisode = int(match[1]) if len(match) > 1 else None
-            else:
-                foundSeason = int(match)
-
-    if foundSeason is None and foundEpisode is None:
-        matches = re.findall(r"season (\d+)", descriptionLower)
-        if matches:
-            foundSeason = int(matches[0])
+        return [], None
 
-    if foundSeason != targetSeason or (foundEpisode is not None and foundEpisode != targetEpisode):
-        return True
+    finally:
+        for future in futures:
+            future.cancel()
 
-    return False
 
-def isVideoInDatabase(tvShowName, season, episode, videoUrl):
+def getKnownVideoUrls(tvShowName, season, episode):
     """
-    Checks whether a YouTube video already exists in the database for a particular TV show, season, and episode.
+    Retrieves the URLs of the YouTube videos already stored in the database for a particular TV show, season, and episode.
 
-    This function queries the database to verify if a video URL for the specified show, season, and episode has already been stored.
+    A single query returns all of them, so checking the results of a search is a membership test on the returned set.
 
     Args:
         tvShowName (str): The name of the TV show.
         season (int): The season number of the TV show.
         episode (int): The episode number of the TV show.
-        videoUrl (str): The URL of the YouTube video.
 
     Returns:
-        bool: True if the video is already in the database, False otherwise.
+        set: The URLs of the videos already in the database (empty if there are none or an error occurs).
 
     Exceptions:
-        mysql.connector.Error: If an error occurs while executing the query.
+        DatabaseError: If an error occurs while executing the query.
     """
     try:
-        query = """
-            SELECT tv_shows.id 
-            FROM tv_shows 
-            WHERE tv_shows.name = %s
-        """
-        myCursor.execute(query, (tvShowName,))
-        result = myCursor.fetchone()
-
-        if not result:
-            logging.error(f"Error: Tv show '{tvShowName}' not found in the database")
-            return False
-
-        tv_show_id = result[0]
-
-        query = """
-            SELECT 1 
-            FROM youtube_videos AS yv
-            INNER JOIN tv_shows AS ts ON ts.id = yv.tv_show_id
-            WHERE ts.id = %s AND yv.season = %s AND yv.episode = %s AND yv.url = %s
-        """
-        myCursor.execute(query, (tv_show_id, season, episode, videoUrl))
-        result = myCursor.fetchone()
-
-        return result is not None
-
-    except mysql.connector.Error as error:
-        logging.error(f"Error checking video in the database: {str(error)}")
-        return False
\ No newline at end of file
+        with getCursor() as cursor:
+            query = """
+                SELECT yv.url
+                FROM youtube_videos AS yv
+                INNER JOIN tv_shows AS ts ON ts.id = yv.tv_show_id
+                WHERE ts.name = %s AND yv.season = %s AND yv.episode = %s
+            """
+            cursor.execute(query, (tvShowName, season, episode))
+            return {row[0] for row in cursor.fetchall()}
+
+    except DatabaseError as error:
+        logging.error(f"Error checking videos in the database: {str(error)}")
+        return set()
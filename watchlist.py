@@ -0,0 +1,285 @@
+import csv
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from config import MAX_WORKERS, IMPORT_CHUNK_SIZE, SEED_WATCHLIST_FILE
+from dbConnector import getCursor, DatabaseError
+from imdb import getShowDetails
+from utils import verifyEpisodeFormat, verifyDateFormat
+
+WATCHLIST_FIELDS = ["name", "link", "score", "last_watched_episode", "date", "imdb_id", "tvmaze_id", "tvmaze_status", "release_date"]
+IMDB_ID_PATTERN = re.compile(r"tt\d+")
+
+
+def readWatchlist(path):
+    """
+    Reads a watchlist file. The format is chosen by the extension: '.json' (a list of objects) or '.csv' (with a header row).
+
+    Every TV show needs a 'link' (or an 'imdb_id') and a 'score'; the other fields of 'WATCHLIST_FIELDS' are optional.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        list: The TV shows of the file, as dictionaries.
+
+    Exceptions:
+        OSError: If the file can't be read.
+        ValueError: If the file is not a valid watchlist.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.lower().endswith(".json"):
+            entries = json.load(file)
+            if not isinstance(entries, list):
+                raise ValueError("A JSON watchlist must be a list of TV shows")
+            return entries
+        return list(csv.DictReader(file))
+
+
+def writeWatchlist(path, entries):
+    """
+    Writes a watchlist file, as JSON or CSV depending on the extension of 'path'.
+
+    Args:
+        path (str): The path of the file.
+        entries (iterable): The TV shows, as dictionaries with the keys of 'WATCHLIST_FIELDS'.
+
+    Returns:
+        int: The number of TV shows written.
+
+    Exceptions:
+        OSError: If the file can't be written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if path.lower().endswith(".json"):
+            file.write("[")
+            for entry in entries:
+                file.write(("," if count else "") + "\n  " + json.dumps(entry, default=str))
+                count += 1
+            file.write("\n]\n")
+        else:
+            writer = csv.DictWriter(file, fieldnames=WATCHLIST_FIELDS)
+            writer.writeheader()
+            for entry in entries:
+                writer.writerow(entry)
+                count += 1
+    return count
+
+
+def normalizeEntry(entry):
+    """
+    Validates a TV show of a watchlist and converts it to the values stored in the 'tv_shows' table.
+
+    Args:
+        entry (dict): The TV show, as read from the file.
+
+    Returns:
+        dict: The TV show with a canonical IMDb 'link', its 'imdb_id', a float 'score' and 'None' for the missing fields.
+
+    Exceptions:
+        ValueError: If the TV show has no IMDb ID, an invalid score, episode or date.
+    """
+    def getField(name):
+        value = entry.get(name)
+        value = value.strip() if isinstance(value, str) else value
+        return value if value not in ("", None) else None
+
+    match = IMDB_ID_PATTERN.search(str(getField("imdb_id") or getField("link") or ""))
+    if not match:
+        raise ValueError("no IMDb link or ID")
+    imdb_id = match.group()
+
+    score = float(getField("score"))
+    if not 1.0 <= score <= 10.0:
+        raise ValueError(f"score {score} is not between 1 and 10")
+
+    last_watched_episode = getField("last_watched_episode")
+    if last_watched_episode is not None and not verifyEpisodeFormat(last_watched_episode):
+        raise ValueError(f"invalid episode '{last_watched_episode}'")
+
+    for date_field in ("date", "release_date"):
+        value = getField(date_field)
+        if value is not None and not verifyDateFormat(str(value)):
+            raise ValueError(f"invalid {date_field} '{value}'")
+
+    tvmaze_id = getField("tvmaze_id")
+    return {
+        "name": getField("name"),
+        "link": f"https://www.imdb.com/title/{imdb_id}/",
+        "score": score,
+        "last_watched_episode": last_watched_episode,
+        "date": getField("date"),
+        "imdb_id": imdb_id,
+        "tvmaze_id": int(tvmaze_id) if tvmaze_id is not None else None,
+        "tvmaze_status": getField("tvmaze_status"),
+        "release_date": getField("release_date")
+    }
+
+
+def resolveEntry(entry):
+    """
+    Fills in the name and the release date of a TV show from OMDB, when the watchlist doesn't have them.
+
+    Args:
+        entry (dict): The normalized TV show.
+
+    Returns:
+        dict: The same TV show, with the details that could be found.
+    """
+    if entry["name"] is not None and entry["release_date"] is not None:
+        return entry
+
+    try:
+        details = getShowDetails(entry["link"])
+    except Exception as e:
+        logging.error(f"Error fetching the details of {entry['link']}: {e}")
+        details = None
+
+    if details:
+        entry["name"] = entry["name"] or details["title"]
+        entry["release_date"] = entry["release_date"] or details["release_date"]
+    return entry
+
+
+def importWatchlist(path, max_workers=MAX_WORKERS, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    This function adds the TV shows of a watchlist file (see 'readWatchlist') to the 'tv_shows' table.
+
+    The TV shows that are invalid, repeated in the file or already in the database (by IMDb ID or name) are skipped before anything
+    is requested. The names and release dates missing from the file are then looked up on OMDB concurrently, by at most 'max_workers'
+    threads (still within the rate limit of OMDB), and the TV shows are inserted with one 'executemany' per chunk of 'chunk_size' rows,
+    each chunk in its own transaction. When a chunk is rejected, its TV shows are inserted again one by one, so only the rows the
+    database rejects are left out, and each of them is logged.
+    The TVMaze ids and statuses are not looked up during the import, to stay within the rate limit of TVMaze: the ones missing from the
+    file are looked up and saved the first time the next episode report ('getUnwatchedEpisodes') runs, or all at once with the 'backfill' command.
+
+    Args:
+        path (str): The path of the watchlist file.
+        max_workers (int): The maximum number of OMDB requests sent at the same time.
+        chunk_size (int): The number of TV shows inserted in each transaction.
+
+    Returns:
+        dict: The number of TV shows 'added', 'skipped' (invalid or duplicated) and 'failed' (unresolved or not inserted), or 'None' if
+        the file couldn't be read or the TV shows already in the database couldn't be queried.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the queries.
+    """
+    counts = {"added": 0, "skipped": 0, "failed": 0}
+
+    try:
+        entries = readWatchlist(path)
+    except (OSError, ValueError, csv.Error) as e:
+        logging.error(f"Error reading the watchlist '{path}': {e}")
+        return None
+
+    try:
+        with getCursor() as cursor:
+            cursor.execute("SELECT name, link FROM tv_shows")
+            rows = cursor.fetchall()
+        database_names = {name for name, link in rows}
+        known_names = set(database_names)
+        known_ids = {match.group() for name, link in rows for match in [IMDB_ID_PATTERN.search(link)] if match}
+
+        pending = []
+        for position, entry in enumerate(entries, start=1):
+            try:
+                entry = normalizeEntry(entry)
+            except (AttributeError, TypeError, ValueError) as e:
+                logging.warning(f"Skipping TV show {position} of the watchlist: {e}")
+                counts["skipped"] += 1
+                continue
+
+            if entry["imdb_id"] in known_ids or (entry["name"] is not None and entry["name"] in known_names):
+                counts["skipped"] += 1
+                continue
+            known_ids.add(entry["imdb_id"])
+            if entry["name"] is not None:
+                known_names.add(entry["name"])
+            pending.append(entry)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            resolved = list(executor.map(resolveEntry, pending))
+
+        rows = []
+        used_names = database_names
+        for entry in resolved:
+            if entry["name"] is None:
+                logging.error(f"Couldn't find the name of {entry['link']}, the TV show was not imported")
+                counts["failed"] += 1
+            elif entry["name"] in used_names:
+                counts["skipped"] += 1
+            else:
+                used_names.add(entry["name"])
+                rows.append(tuple(entry[field] for field in WATCHLIST_FIELDS))
+
+        query = f"INSERT INTO tv_shows ({', '.join(WATCHLIST_FIELDS)}) VALUES ({', '.join(['%s'] * len(WATCHLIST_FIELDS))})"
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                with getCursor() as cursor:
+                    cursor.executemany(query, chunk)
+                counts["added"] += len(chunk)
+            except DatabaseError as error:
+                logging.warning(f"Error at importing TV shows {start + 1}-{start + len(chunk)}, importing them one by one: {error}")
+                for row in chunk:
+                    try:
+                        with getCursor() as cursor:
+                            cursor.execute(query, row)
+                        counts["added"] += 1
+                    except DatabaseError as row_error:
+                        logging.error(f"TV show '{row[0]}' ({row[1]}) was not imported: {row_error}", extra={"show": row[0]})
+                        counts["failed"] += 1
+
+    except DatabaseError as error:
+        logging.error(f"Error at importing the watchlist: {error}")
+        return None
+
+    logging.info(f"Watchlist '{path}' imported: {counts['added']} added, {counts['skipped']} skipped, {counts['failed']} failed", extra=counts)
+    return counts
+
+
+def exportWatchlist(path):
+    """
+    This function writes all the TV shows of the 'tv_shows' table to a watchlist file (JSON or CSV, by the extension of 'path').
+
+    The rows are read and written in batches, so the whole table is never held in memory.
+
+    Args:
+        path (str): The path of the watchlist file.
+
+    Returns:
+        int: The number of TV shows exported, or 'None' if an error occurs.
+
+    Exceptions:
+        DatabaseError: If an error occurs while executing the query.
+    """
+    def getEntries(cursor):
+        while True:
+            rows = cursor.fetchmany(IMPORT_CHUNK_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield {field: (str(value) if field in ("date", "release_date") and value is not None else value)
+                       for field, value in zip(WATCHLIST_FIELDS, row)}
+
+    try:
+        with getCursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(WATCHLIST_FIELDS)} FROM tv_shows ORDER BY name")
+            count = writeWatchlist(path, getEntries(cursor))
+        logging.info(f"{count} TV shows exported to '{path}'")
+        return count
+    except (DatabaseError, OSError) as error:
+        logging.error(f"Error at exporting the watchlist: {error}")
+        return None
+
+
+def addTVShows():
+    """
+    This function adds the TV shows of the seed watchlist ('SEED_WATCHLIST_FILE') to the 'tv_shows' table.
+
+    The TV shows that are already in the table are skipped, so it can run at every start.
+    """
+    importWatchlist(SEED_WATCHLIST_FILE)
@@ -0,0 +1,44 @@
+import json
+import threading
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from config import YOUTUBE_API_KEY, YOUTUBE_API_ENDPOINT
+
+discoveryDocument = None
+discoveryDocumentLock = threading.Lock()
+clients = threading.local()
+
+
+def getDiscoveryDocument():
+    """
+    Returns the YouTube Data API v3 discovery document, parsed once per process.
+
+    The document is the static copy bundled with google-api-python-client, so it is never downloaded.
+
+    Returns:
+        dict: The parsed discovery document.
+    """
+    global discoveryDocument
+    with discoveryDocumentLock:
+        if discoveryDocument is None:
+            discoveryDocument = json.loads(get_static_doc("youtube", "v3"))
+        return discoveryDocument
+
+
+def getYoutubeClient():
+    """
+    Returns the YouTube Data API client of the calling thread, building it the first time the thread asks for it.
+
+    The client is built from the bundled discovery document and reused, together with its HTTP transport, for every later search.
+    If 'YOUTUBE_API_ENDPOINT' is set in the configuration, the client sends its requests there instead of the public API.
+    The httplib2 transport used by the client is not thread safe, so each thread (the REPL and the notification poller) gets its own client.
+
+    Returns:
+        googleapiclient.discovery.Resource: The YouTube service object.
+    """
+    client = getattr(clients, "youtube", None)
+    if client is None:
+        client_options = {"api_endpoint": YOUTUBE_API_ENDPOINT} if YOUTUBE_API_ENDPOINT else None
+        client = build_from_document(getDiscoveryDocument(), developerKey=YOUTUBE_API_KEY, client_options=client_options)
+        clients.youtube = client
+    return client